@@ -0,0 +1,131 @@
+"""Cold start: import time of the portal script and first vs. warm reruns.
+
+1. Imports csmforchirag.py under ``python -X importtime`` and reports the
+   total and the slowest modules it imports directly.
+2. For PORTAL_WARMUP=0 and =1, starts a fresh `streamlit run` process
+   against the stub backend and plays the same short script twice: first as
+   the first session after the restart, then as a second session. Reports
+   how long the server took to come up and each step's time for both
+   sessions, plus the cold/warm ratio per step.
+
+    pip install -r benchmarks/requirements.txt   # load_test's websockets
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --think-ms 300 --latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_flows import APP, ROOT  # noqa: E402
+from load_test import BrowserSession, start_portal  # noqa: E402
+from stub_backend import add_backend_arguments, backend_from_args  # noqa: E402
+
+
+def import_times(top=10):
+    env = dict(os.environ, API_BASE="http://127.0.0.1:9", RM_API_KEY="bench", PORTAL_WARMUP="0")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import csmforchirag"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    script_us = 0
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0 and name.strip() == "csmforchirag":
+            script_us = int(cumulative_us)
+        elif depth == 1:
+            # Children print before their parent: these belong to the next
+            # depth-0 line, and only the script's survive to the end.
+            rows.append((name.strip(), int(cumulative_us)))
+        elif depth == 0:
+            rows.clear()
+    rows.sort(key=lambda r: -r[1])
+    return {
+        "python_import_wall_ms": round(wall * 1000, 1),
+        "script_import_ms": round(script_us / 1000, 1),
+        "slowest": [{"module": name, "ms": round(us / 1000, 1)} for name, us in rows[:top]],
+    }
+
+
+async def play(url, think_ms):
+    """First render, connect, then the sections that need pandas/openpyxl."""
+    b = BrowserSession(url)
+    steps = {}
+    await b.connect()
+
+    async def step(name, **rerun_args):
+        steps[name] = round(await b.rerun(**rerun_args) * 1000, 1)
+        await asyncio.sleep(think_ms / 1000)
+
+    try:
+        await step("first_render")
+        await step(
+            "connect",
+            trigger=b.widget("button", "Connect to Repo"),
+            widgets={b.widget("text_input", "Customer ID"): ("string_value", f"cold-{time.time_ns()}")},
+        )
+        await step("batch_tab", page="batch_splitter")
+        await step("ranks_tab", page="ranks_tab")
+        await step("ranks_load", trigger=b.widget("button", "Click to load"))
+        await step("recommendations_tab", page="update_recommendation_tab")
+    finally:
+        await b.close()
+    return steps
+
+
+def cold_vs_warm(backend, warmup, think_ms, log_path):
+    started = time.perf_counter()
+    proc, url = start_portal(backend.url, log_path, {"PORTAL_WARMUP": "1" if warmup else "0"})
+    ready = time.perf_counter() - started
+    try:
+        cold = asyncio.run(play(url, think_ms))
+        warm = asyncio.run(play(url, think_ms))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return {
+        "warmup": warmup,
+        "server_ready_ms": round(ready * 1000, 1),
+        "first_session_ms": cold,
+        "second_session_ms": warm,
+        "cold_over_warm": {k: round(cold[k] / warm[k], 2) if warm[k] else None for k in cold},
+        "first_session_total_ms": round(sum(cold.values()), 1),
+        "second_session_total_ms": round(sum(warm.values()), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_backend_arguments(parser)
+    parser.add_argument("--think-ms", type=float, default=1000, help="pause between steps, like a user reading")
+    parser.add_argument("--server-log", default=os.path.join(tempfile.gettempdir(), "portal_cold_start.log"))
+    args = parser.parse_args()
+
+    backend = backend_from_args(args).start()
+    try:
+        runs = [cold_vs_warm(backend, warmup, args.think_ms, args.server_log) for warmup in (False, True)]
+    finally:
+        backend.stop()
+    print(json.dumps({
+        "benchmark": "cold_start",
+        "app": APP,
+        "config": {"think_ms": args.think_ms, "latency_ms": args.latency_ms},
+        "import": import_times(),
+        "runs": runs,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Compare rank/recommendation upload parsing: pd.read_excel vs read_excel_columns.
+
+Builds workbooks shaped like the recommendations template (the four columns
+the portal needs plus a few it ignores) and times both ingestion paths on
+them. Prints one JSON document with the timings.
+
+    python benchmarks/bench_excel_ingest.py            # 10k and 100k rows
+    python benchmarks/bench_excel_ingest.py 5000 50000
+"""
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+from openpyxl import Workbook  # noqa: E402
+
+from csmforchirag import EXCEL_MAX_ROWS, read_excel_columns  # noqa: E402
+
+COLUMNS = (
+    "initiativename",
+    "recommendation_withoutcollateral",
+    "recommendation_withcollateral_a",
+    "recommendation_withcollateral_b",
+)
+EXTRA_COLUMNS = ("description", "owner", "category", "notes", "rank")
+
+
+def build_workbook(rows, header=COLUMNS + EXTRA_COLUMNS):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(header))
+    for i in range(rows):
+        ws.append([
+            f"Initiative {i}",
+            f"Recommendation text without collateral for initiative {i}",
+            f"Collateral A copy {i}",
+            f"Collateral B copy {i}",
+            f"Longer description of initiative {i} that the portal never reads",
+            f"owner{i % 50}@example.com",
+            f"category {i % 12}",
+            None,
+            i + 1,
+        ])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def current_path(data):
+    df = pd.read_excel(io.BytesIO(data))
+    df.columns = [c.strip().lower() for c in df.columns]
+    return df[list(COLUMNS)]
+
+
+def streaming_path(data):
+    return read_excel_columns(io.BytesIO(data), COLUMNS, max_rows=max(EXCEL_MAX_ROWS, 10**7))
+
+
+def measure(fn, data, repeat=3, trace_memory=True):
+    """Best-of-`repeat` wall time, then one separate run under tracemalloc
+    (which slows the parse too much to time it in the same pass)."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            df = fn(data)
+            rows = len(df)
+        except (KeyError, ValueError):
+            rows = None
+        best = min(best, time.perf_counter() - started)
+    if not trace_memory:
+        return {"seconds": round(best, 3), "rows": rows}
+    tracemalloc.start()
+    try:
+        fn(data)
+    except (KeyError, ValueError):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(best, 3), "peak_mb": round(peak / 2**20, 1), "rows": rows}
+
+
+def main(sizes):
+    results = []
+    for rows in sizes:
+        data = build_workbook(rows)
+        # Same file with a misspelt header: how long until each path rejects it.
+        bad = build_workbook(rows, ("initiative_name",) + COLUMNS[1:] + EXTRA_COLUMNS)
+        repeat = 3 if rows <= 20_000 else 1
+        current = measure(current_path, data, repeat)
+        streaming = measure(streaming_path, data, repeat)
+        results.append({
+            "rows": rows,
+            "file_mb": round(len(data) / 2**20, 2),
+            "pd_read_excel": current,
+            "read_excel_columns": streaming,
+            "speedup": round(current["seconds"] / streaming["seconds"], 2) if streaming["seconds"] else None,
+            "bad_header_reject_seconds": {
+                "pd_read_excel": measure(current_path, bad, 1, trace_memory=False)["seconds"],
+                "read_excel_columns": measure(streaming_path, bad, 1, trace_memory=False)["seconds"],
+            },
+        })
+    print(json.dumps({"benchmark": "excel_ingest", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
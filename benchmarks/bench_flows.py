@@ -0,0 +1,252 @@
+"""Time the portal's user flows against the local stub backend.
+
+Starts benchmarks/stub_backend.py in-process and drives the real app with
+Streamlit's AppTest: connect, switching sections, the batch history, the
+all-batches overview, loading ranks. AppTest cannot fill file uploaders or
+data editors, so the rank save, Excel upload, chunked contacts upload and
+export download flows call the same functions the tabs call, in the same
+order. Prints one JSON document; with --baseline it also compares medians
+against an earlier run and exits 1 when a flow got slower than --threshold
+times its baseline.
+
+    python benchmarks/bench_flows.py > baseline.json
+    python benchmarks/bench_flows.py --latency-ms 40 --accounts 200 --repeat 10
+    python benchmarks/bench_flows.py --baseline baseline.json --threshold 1.25
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_backend import add_backend_arguments, backend_from_args  # noqa: E402
+
+APP = os.path.join(ROOT, "csmforchirag.py")
+SECTIONS = ("contacts_tab", "ranks_tab", "update_recommendation_tab", "batch_splitter")
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def check(at):
+    if at.exception:
+        raise RuntimeError(f"App raised: {at.exception[0].value}")
+    if at.error:
+        raise RuntimeError(f"App reported: {at.error[0].value}")
+    return at
+
+
+def switch_to(at, url_path):
+    """Select an st.navigation page by url_path.
+
+    AppTest.switch_page only resolves file-based pages, so this is the one
+    place that reaches into AppTest's private state: `_registered_pages`
+    (page hash -> page info, filled by the last run) and `_page_hash` (the
+    page the next run renders). Nothing else in the benchmarks touches them;
+    if a Streamlit upgrade renames them, only this helper needs changing.
+    """
+    try:
+        pages = at._registered_pages
+    except AttributeError:
+        raise RuntimeError("This Streamlit's AppTest has no _registered_pages; update switch_to")
+    for page_hash, info in pages.items():
+        if info.get("url_pathname") == url_path:
+            at._page_hash = page_hash
+            return at
+    raise ValueError(f"No page with url_path {url_path!r}")
+
+
+def connected_app(customer_id, timings):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    secs, _ = timed(at.run)
+    timings["first_render"].append(secs)
+    check(at)
+    at.text_input[0].input(customer_id)
+    at.button[0].click()
+    secs, _ = timed(at.run)
+    timings["connect"].append(secs)
+    return check(at)
+
+
+def app_flows(repeat, timings):
+    for i in range(repeat):
+        # A new customer every time, so the shared bootstrap cache stays cold.
+        at = connected_app(f"bench-{os.getpid()}-{i}", timings)
+        for section in SECTIONS:
+            secs, _ = timed(switch_to(at, section).run)
+            timings["tab_switch"].append(secs)
+            check(at)
+
+        switch_to(at, "batch_splitter")
+        secs, _ = timed(at.run)
+        timings["batch_history_rerun"].append(secs)
+        check(at)
+        next(b for b in at.button if b.label == "Refresh").click()
+        secs, _ = timed(at.run)
+        timings["batch_history_refresh"].append(secs)
+        check(at)
+
+        # Every batch's history at once; with --latency-ms this should cost
+        # about one call, not one per batch.
+        secs, _ = timed(switch_to(at, "batch_overview_tab").run)
+        timings["batch_overview"].append(secs)
+        check(at)
+
+        switch_to(at, "ranks_tab").run()
+        next(b for b in at.button if b.label.startswith("Click to load")).click()
+        secs, _ = timed(at.run)
+        timings["rank_load"].append(secs)
+        check(at)
+
+
+def headless_flows(app, backend, repeat, timings, upload_rows, contacts_mb):
+    import pandas as pd
+    from bench_excel_ingest import build_workbook
+
+    customer_id = "bench-headless"
+    account = backend.accounts[0]
+    workbook = build_workbook(upload_rows)
+    contacts = b"".join(
+        f"user{i}@example.com,First{i},Last{i},Title {i % 40}\n".encode()
+        for i in range(contacts_mb * 1024 * 1024 // 48)
+    )
+
+    for _ in range(repeat):
+        # Rank save: Save ranking + the confirm dialog, with one rank in 50 changed.
+        started = time.perf_counter()
+        rows, _ = app.call_api("get", "ranks_table", params={"customer_id": customer_id, "account": account})
+        rows = rows["rows"]
+        edited = pd.DataFrame(rows)
+        edited.loc[::50, "rank"] = edited.loc[::50, "rank"] + len(edited)
+        report = app.validate_initiative_rows(edited, known={r["initiativename"] for r in rows})
+        patch = [{**r, "rank": int(r["rank"])} for r in app.changed_rank_rows(rows, edited)]
+        resp, error = app.call_api(
+            "post", "update_ranks",
+            json={"customer_id": customer_id, "account": account, "rows": patch, "mode": "patch"},
+        )
+        timings["rank_save"].append(time.perf_counter() - started)
+        if not report.empty or error:
+            raise RuntimeError(f"rank save failed: {error or report}")
+
+        # Excel upload: the ranks tab's "Submit Ranks from Excel" path.
+        started = time.perf_counter()
+        df = app.read_excel_columns(io.BytesIO(workbook), ("initiativename", "rank"))
+        df = df.dropna(subset=["initiativename", "rank"])
+        report = app.validate_initiative_rows(df, row_numbers=df.index)
+        df["rank"] = pd.to_numeric(df["rank"]).astype(int)
+        resp, error = app.call_api(
+            "post", "update_ranks",
+            json={"customer_id": customer_id, "account": account, "rows": df.to_dict("records")},
+        )
+        timings["excel_upload"].append(time.perf_counter() - started)
+        if not report.empty or error:
+            raise RuntimeError(f"excel upload failed: {error or report}")
+
+        secs, _ = timed(
+            app.upload_contacts_chunked, io.BytesIO(contacts), len(contacts), customer_id, account, {},
+        )
+        timings["contacts_upload"].append(secs)
+
+        params = {"customer_id": customer_id}
+        secs, export = timed(app.download_to_file, "download_products_excel", params, force=True)
+        export.close()
+        timings["export_download"].append(secs)
+        secs, export = timed(app.download_to_file, "download_products_excel", params)
+        export.close()
+        timings["export_download_cached"].append(secs)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 1),
+        "median_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = {}
+    for flow, stats in results.items():
+        before = baseline.get(flow)
+        if before and before["median_ms"] and stats["median_ms"] > before["median_ms"] * threshold:
+            regressions[flow] = {
+                "baseline_median_ms": before["median_ms"],
+                "median_ms": stats["median_ms"],
+                "ratio": round(stats["median_ms"] / before["median_ms"], 2),
+            }
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_backend_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--upload-rows", type=int, default=5000, help="rows in the uploaded ranks workbook")
+    parser.add_argument("--contacts-mb", type=int, default=8, help="size of the chunked contacts upload")
+    parser.add_argument("--baseline", help="earlier output of this script to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    backend = backend_from_args(args).start()
+    os.environ["API_BASE"] = backend.url
+    os.environ["RM_API_KEY"] = "bench"
+    os.environ["ARTIFACT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_artifacts_")
+    os.environ.setdefault("PORTAL_LAZY_NAV", "1")
+    import csmforchirag as app
+
+    flows = (
+        "first_render", "connect", "tab_switch", "batch_history_rerun", "batch_history_refresh",
+        "batch_overview", "rank_load", "rank_save", "excel_upload", "contacts_upload", "export_download",
+        "export_download_cached",
+    )
+    timings = {flow: [] for flow in flows}
+    try:
+        app_flows(args.repeat, timings)
+        headless_flows(app, backend, args.repeat, timings, args.upload_rows, args.contacts_mb)
+    finally:
+        backend.stop()
+
+    results = {flow: summarize(samples) for flow, samples in timings.items() if samples}
+    report = {
+        "benchmark": "flows",
+        "config": {
+            "repeat": args.repeat,
+            "latency_ms": args.latency_ms,
+            "endpoint_latency": args.endpoint_latency or [],
+            "accounts": args.accounts,
+            "ranks_rows": args.ranks_rows,
+            "download_kb": args.download_kb,
+            "upload_rows": args.upload_rows,
+            "contacts_mb": args.contacts_mb,
+        },
+        "results": results,
+        "requests": backend.counts,
+    }
+    regressions = None
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        report["regressions"] = regressions
+    print(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
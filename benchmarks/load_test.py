@@ -0,0 +1,420 @@
+"""Load test: N concurrent browser sessions against one `streamlit run` process.
+
+Starts the stub backend (benchmarks/stub_backend.py) and the portal as a real
+Streamlit server, then opens N sessions over Streamlit's websocket protocol,
+the way browser tabs do. Each session runs a CSM's quarter-start script with
+some think time between steps: connect, open every batch tab, launch a batch,
+load the ranks of an account, upload a ranks workbook (through the real file
+upload endpoint).
+
+For each session count it reports rerun latency (p50/p95/p99, overall and per
+step), the server process's RSS and thread count (sampled while the level
+runs), and the request rate the stub backend saw. Prints one JSON document.
+
+    pip install -r benchmarks/requirements.txt              # adds websockets
+    python benchmarks/load_test.py                          # 5, 10, 20, 40 sessions
+    python benchmarks/load_test.py --sessions 10,40,80 --latency-ms 40 --iterations 3
+
+XSRF protection is switched off for the server it starts: the harness uploads
+files without a browser cookie jar.
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import websockets
+from openpyxl import Workbook
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import FileUploaderState
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_flows import APP  # noqa: E402
+from stub_backend import BATCH_TYPES, add_backend_arguments, backend_from_args  # noqa: E402
+
+# script_finished statuses after which the server keeps running the script.
+RERUN_CONTINUES = (ForwardMsg.FINISHED_EARLY_FOR_RERUN, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+
+def proc_status(pid, field):
+    """A numeric field of /proc/<pid>/status (None where /proc is missing)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {"count": len(ordered), "p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": at(1.0)}
+
+
+def ranks_workbook(rows):
+    """An upload for the ranks tab: initiativename + rank."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["initiativename", "rank"])
+    for i in range(rows):
+        ws.append([f"Initiative {i:05d}", i + 1])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_portal(api_base, log_path, extra_env=None):
+    port = free_port()
+    env = dict(os.environ, API_BASE=api_base, RM_API_KEY="load-test", **(extra_env or {}))
+    env.setdefault("ARTIFACT_CACHE_DIR", tempfile.mkdtemp(prefix="load_artifacts_"))
+    # The child gets its own copy of the log's descriptor.
+    with open(log_path, "wb") as log:
+        proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", APP,
+                "--server.port", str(port),
+                "--server.headless", "true",
+                "--server.enableXsrfProtection", "false",
+                "--browser.gatherUsageStats", "false",
+            ],
+            env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited early, see {log_path}")
+        try:
+            if requests.get(f"{url}/_stcore/health", timeout=1).ok:
+                return proc, url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"streamlit did not come up, see {log_path}")
+
+
+class Sampler(threading.Thread):
+    """Samples the server's RSS and thread count every `interval` seconds."""
+
+    def __init__(self, pid, interval=0.25):
+        super().__init__(name="load-sampler", daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.rss_kb = []
+        self.threads = []
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            rss, threads = proc_status(self.pid, "VmRSS"), proc_status(self.pid, "Threads")
+            if rss is not None:
+                self.rss_kb.append(rss)
+                self.threads.append(threads)
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class BrowserSession:
+    """Speaks just enough of the Streamlit websocket protocol to be a tab.
+
+    Keeps the values of the widgets it has set (the browser resends all of
+    them on every rerun), the pages st.navigation registered and the elements
+    of the last run, so widgets can be found by kind and label.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.ws = None
+        self.session_id = None
+        self.pages = {}      # url_path -> page_script_hash
+        self.page_hash = ""
+        self.values = {}     # widget id -> (value field, value)
+        self.elements = []   # (kind, proto) of the last run
+        self.errors = []
+        self._request_ids = itertools.count(1)
+
+    async def connect(self):
+        ws_url = self.url.replace("http://", "ws://") + "/_stcore/stream"
+        self.ws = await websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def _recv(self):
+        msg = ForwardMsg()
+        msg.ParseFromString(await self.ws.recv())
+        kind = msg.WhichOneof("type")
+        if kind == "new_session":
+            self.session_id = msg.new_session.initialize.session_id or self.session_id
+        elif kind == "navigation":
+            self.pages = {p.url_pathname: p.page_script_hash for p in msg.navigation.app_pages}
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            element = msg.delta.new_element
+            element_kind = element.WhichOneof("type")
+            proto = getattr(element, element_kind)
+            self.elements.append((element_kind, proto))
+            if element_kind == "exception":
+                self.errors.append(f"{proto.type}: {proto.message}")
+            elif element_kind == "alert" and proto.format == proto.ERROR:
+                self.errors.append(proto.body)
+        return msg
+
+    async def rerun(self, page=None, trigger=None, widgets=None):
+        """Rerun like the browser does after an interaction; returns the seconds
+        until the script finished (following any st.rerun() it made).
+
+        `widgets` maps widget ids to ``(value field, value)``; `trigger` is the
+        id of a clicked button.
+        """
+        if page is not None:
+            self.page_hash = self.pages[page]
+        self.values.update(widgets or {})
+        back = BackMsg()
+        state = back.rerun_script
+        state.query_string = ""
+        state.page_script_hash = self.page_hash
+        for widget_id, (field, value) in self.values.items():
+            widget = state.widget_states.widgets.add()
+            widget.id = widget_id
+            if field == "string_array_value":
+                widget.string_array_value.data[:] = value
+            elif field == "file_uploader_state_value":
+                widget.file_uploader_state_value.CopyFrom(value)
+            else:
+                setattr(widget, field, value)
+        if trigger:
+            widget = state.widget_states.widgets.add()
+            widget.id = trigger
+            widget.trigger_value = True
+
+        self.elements = []
+        started = time.perf_counter()
+        await self.ws.send(back.SerializeToString())
+        while True:
+            msg = await self._recv()
+            if msg.WhichOneof("type") == "script_finished" and msg.script_finished not in RERUN_CONTINUES:
+                return time.perf_counter() - started
+
+    def widget(self, kind, label):
+        """The id of the last run's `kind` widget whose label starts with `label`."""
+        for element_kind, proto in self.elements:
+            if element_kind == kind and proto.label.startswith(label):
+                return proto.id
+        raise LookupError(f"no {kind} labelled {label!r} on this page")
+
+    async def upload(self, name, data):
+        """Upload a file like st.file_uploader does; returns the widget value."""
+        back = BackMsg()
+        request_id = str(next(self._request_ids))
+        back.file_urls_request.request_id = request_id
+        back.file_urls_request.session_id = self.session_id
+        back.file_urls_request.file_names.append(name)
+        await self.ws.send(back.SerializeToString())
+        while True:
+            msg = await self._recv()
+            if msg.WhichOneof("type") == "file_urls_response" and msg.file_urls_response.response_id == request_id:
+                urls = msg.file_urls_response.file_urls[0]
+                break
+        resp = await asyncio.to_thread(
+            requests.put, self.url + urls.upload_url, files={"file": (name, data)}, timeout=60,
+        )
+        resp.raise_for_status()
+        state = FileUploaderState()
+        info = state.uploaded_file_info.add()
+        info.file_id = urls.file_id
+        info.name = name
+        info.size = len(data)
+        info.file_urls.CopyFrom(urls)
+        return state
+
+
+class VirtualCsm:
+    """One CSM's quarter-start script; step timings go into `results`."""
+
+    def __init__(self, index, url, backend, args, workbook, results):
+        self.index = index
+        self.browser = BrowserSession(url)
+        self.backend = backend
+        self.args = args
+        self.workbook = workbook
+        self.results = results
+        self.rng = random.Random(index)
+        self.customer_id = f"load-customer-{index % args.customers}"
+
+    async def step(self, name, **rerun_args):
+        secs = await self.browser.rerun(**rerun_args)
+        self.results["reruns"].append(secs)
+        self.results["steps"].setdefault(name, []).append(secs)
+        if self.args.think_ms:
+            await asyncio.sleep(self.args.think_ms / 1000 * self.rng.uniform(0.5, 1.5))
+
+    def free_account(self):
+        busy_every = self.backend.busy_every
+        free = [
+            name for i, name in enumerate(self.backend.accounts)
+            if not (busy_every and i % busy_every == 0)
+        ]
+        return self.rng.choice(free or self.backend.accounts)
+
+    async def run(self):
+        b = self.browser
+        await b.connect()
+        try:
+            await self.step("first_render")
+            await self.step(
+                "connect",
+                trigger=b.widget("button", "Connect to Repo"),
+                widgets={b.widget("text_input", "Customer ID"): ("string_value", self.customer_id)},
+            )
+            for _ in range(self.args.iterations):
+                for batch in BATCH_TYPES:
+                    await self.step("batch_tab", page=f"batch_{batch['key']}")
+
+                await self.step("batch_tab", page="batch_splitter")
+                await self.step(
+                    "select_accounts",
+                    widgets={b.widget("multiselect", "Accounts"): ("string_array_value", [self.free_account()])},
+                )
+                await self.step("launch_batch", trigger=b.widget("button", "Run batch"))
+
+                await self.step("ranks_tab", page="ranks_tab")
+                await self.step("ranks_load", trigger=b.widget("button", "Click to load"))
+
+                method = b.widget("radio", "Choose update method")
+                await self.step("ranks_upload_mode", widgets={method: ("string_value", "Upload Excel file")})
+                uploader = b.widget("file_uploader", "Upload Excel")
+                started = time.perf_counter()
+                state = await b.upload("ranks.xlsx", self.workbook)
+                self.results["steps"].setdefault("file_put", []).append(time.perf_counter() - started)
+                await self.step("ranks_attach", widgets={uploader: ("file_uploader_state_value", state)})
+                await self.step("ranks_upload", trigger=b.widget("button", "Submit Ranks from Excel"))
+                await self.step("ranks_manual_mode", widgets={method: ("string_value", "Manual entry")})
+        finally:
+            self.results["errors"].extend(f"session {self.index}: {e}" for e in b.errors)
+            await b.close()
+
+
+async def run_sessions(sessions, url, backend, args, workbook, results):
+    async def one(index):
+        await asyncio.sleep(index * args.ramp_ms / 1000)  # CSMs logging in one after another
+        try:
+            await VirtualCsm(index, url, backend, args, workbook, results).run()
+        except Exception as e:
+            results["errors"].append(f"session {index}: {type(e).__name__}: {e}")
+
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+
+
+def run_level(sessions, proc, url, backend, args, workbook):
+    results = {"reruns": [], "steps": {}, "errors": []}
+    backend.reset_counts()
+    rss_before = proc_status(proc.pid, "VmRSS")
+    sampler = Sampler(proc.pid)
+    sampler.start()
+    started = time.perf_counter()
+    asyncio.run(run_sessions(sessions, url, backend, args, workbook, results))
+    duration = time.perf_counter() - started
+    sampler.stop()
+
+    def mb(kb):
+        return round(kb / 1024, 1) if kb is not None else None
+
+    requests_total = sum(backend.counts.values())
+    return {
+        "sessions": sessions,
+        "duration_s": round(duration, 2),
+        "rerun": percentiles(results["reruns"]),
+        "steps": {name: percentiles(samples) for name, samples in sorted(results["steps"].items())},
+        "errors": len(results["errors"]),
+        "error_samples": results["errors"][:5],
+        "server_rss_mb": {
+            "before": mb(rss_before),
+            "peak": mb(max(sampler.rss_kb, default=None)),
+            "after": mb(proc_status(proc.pid, "VmRSS")),
+        },
+        "server_threads": {
+            "peak": max(sampler.threads, default=None),
+            "after": proc_status(proc.pid, "Threads"),
+        },
+        "requests": requests_total,
+        "requests_per_s": round(requests_total / duration, 1) if duration else None,
+        "requests_by_endpoint": dict(sorted(backend.counts.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_backend_arguments(parser)
+    parser.add_argument("--sessions", default="5,10,20,40", help="comma-separated session counts")
+    parser.add_argument("--iterations", type=int, default=2, help="times each session repeats its script")
+    parser.add_argument("--customers", type=int, default=8, help="distinct customers the sessions spread over")
+    parser.add_argument("--think-ms", type=float, default=300, help="mean pause between a session's steps")
+    parser.add_argument("--ramp-ms", type=float, default=50, help="delay between session starts")
+    parser.add_argument(
+        "--upload-rows", type=int,
+        help="rows in each uploaded ranks workbook (default: --ranks-rows, so every initiative is known)",
+    )
+    parser.add_argument("--server-log", default=os.path.join(tempfile.gettempdir(), "portal_load_test.log"))
+    args = parser.parse_args()
+
+    backend = backend_from_args(args).start()
+    proc, url = start_portal(backend.url, args.server_log)
+    workbook = ranks_workbook(args.upload_rows or args.ranks_rows)
+    levels = []
+    try:
+        for sessions in (int(n) for n in args.sessions.split(",")):
+            levels.append(run_level(sessions, proc, url, backend, args, workbook))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        backend.stop()
+
+    print(json.dumps({
+        "benchmark": "load",
+        "config": {
+            "iterations": args.iterations,
+            "customers": args.customers,
+            "think_ms": args.think_ms,
+            "latency_ms": args.latency_ms,
+            "endpoint_latency": args.endpoint_latency or [],
+            "accounts": args.accounts,
+            "upload_rows": args.upload_rows or args.ranks_rows,
+            "server_log": args.server_log,
+        },
+        "levels": levels,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
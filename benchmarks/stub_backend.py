@@ -0,0 +1,370 @@
+"""Local fake of the portal's backend API, for benchmarks and manual testing.
+
+Implements every endpoint csmforchirag.py calls, with a configurable response
+delay (globally and per endpoint) and configurable payload sizes. Any
+customer_id is accepted. Batch history and batch definitions carry an ETag
+and answer 304 to a matching If-None-Match; exports do the same. Batch
+history honours the offset/limit/status/prefix/last_run_days paging
+parameters unless started with --no-paged-history, and ranks_table its
+offset/limit/search ones unless started with --no-paged-ranks.
+
+Run it on its own and point the portal at it:
+
+    python benchmarks/stub_backend.py --port 8765 --latency-ms 40 \\
+        --endpoint-latency download_usage_tracking=1500 --accounts 50
+    API_BASE=http://127.0.0.1:8765 RM_API_KEY=x streamlit run csmforchirag.py
+
+or start it in-process with ``StubBackend(...).start()`` (see bench_flows.py).
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BATCH_TYPES = [
+    {
+        "key": "splitter",
+        "label": "Splitter",
+        "max_workers": 4,
+        "modes": [
+            {"key": "full", "label": "Full", "default": True},
+            {"key": "quick", "label": "Quick"},
+        ],
+    },
+    {"key": "contacts", "label": "Contacts", "max_workers": 4},
+    {"key": "news", "label": "News", "max_workers": 2},
+]
+EXPORTS = ("download_usage_tracking", "download_products_excel", "download_recommendations_template")
+
+
+class StubBackend:
+    """The fake API server.
+
+    `latency_ms` delays every response; `endpoint_latency_ms` overrides it per
+    endpoint. `accounts` sets the account list (and so the batch history
+    size), `ranks_rows` the initiatives per account, `download_kb` the export
+    size and `busy_every` marks every n-th account as running (0: none).
+    `paged_history` False answers history requests with every account, like
+    a server without paging; `paged_ranks` False does the same for ranks.
+    """
+
+    def __init__(self, port=0, latency_ms=0, endpoint_latency_ms=None, accounts=20,
+                 ranks_rows=200, download_kb=512, busy_every=5, paged_history=True,
+                 paged_ranks=True):
+        self.latency_ms = latency_ms
+        self.endpoint_latency_ms = dict(endpoint_latency_ms or {})
+        self.accounts = [f"account_{i:03d}" for i in range(accounts)]
+        self.ranks_rows = ranks_rows
+        self.download = os.urandom(download_kb * 1024)
+        self.download_etag = f'"{uuid.uuid4().hex[:12]}"'
+        self.busy_every = busy_every
+        self.paged_history = paged_history
+        self.paged_ranks = paged_ranks
+        self.started = datetime.now().replace(microsecond=0)
+        self.counts = {}
+        self.history_version = 1
+        self.batch_types = [dict(b) for b in BATCH_TYPES]
+        self.batch_types_version = 1
+        self.uploads = {}  # upload_id -> bytes received so far
+        self.failures = {}  # endpoint -> [responses left to fail, status, still process]
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-backend", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts = {}
+
+    def fail(self, endpoint, times=1, status=503, process=False):
+        """Answer the next `times` calls to `endpoint` with `status`.
+
+        With `process` the request still takes effect (e.g. a chunk lands)
+        and only its answer is lost.
+        """
+        with self._lock:
+            self.failures[endpoint] = [times, status, process]
+
+    def set_batch_types(self, batch_types):
+        """Swap in new batch definitions, as if the YAML files were edited."""
+        with self._lock:
+            self.batch_types = batch_types
+            self.batch_types_version += 1
+
+    # --- responses ---
+    def history(self, batch_type):
+        history = {}
+        busy = {}
+        for i, name in enumerate(self.accounts):
+            if i % 3 == 2:
+                continue  # never run
+            running = self.busy_every and i % self.busy_every == 0
+            started = self.started - timedelta(days=0 if running else i % 45, minutes=12)
+            history[name] = {
+                "batch_id": 1000 + i,
+                "status": "in_progress" if running else ("completed" if i % 7 else "failed"),
+                "started_at": f"{started:%Y-%m-%d %H:%M:%S}",
+                "finished_at": None if running else f"{started + timedelta(minutes=12):%Y-%m-%d %H:%M:%S}",
+                "scripts_succeeded": 1 if running else 3,
+                "scripts_failed": 0 if running or i % 7 else 1,
+                "scripts_total": 3,
+                "mode": "full" if batch_type == "splitter" else None,
+            }
+            if running:
+                busy[name] = batch_type
+        return {"history": history, "busy": busy, "version": self.history_version}
+
+    def history_page(self, batch_type, query):
+        """One filtered page of history, with the accounts in order and the total."""
+        full = self.history(batch_type)
+        statuses = set(filter(None, query.get("status", "").split(",")))
+        prefix = query.get("prefix", "").lower()
+        cutoff = None
+        if query.get("last_run_days"):
+            cutoff = datetime.now() - timedelta(days=float(query["last_run_days"]))
+        names = []
+        for name in sorted(self.accounts):
+            rec = full["history"].get(name)
+            if statuses and (rec["status"] if rec else "never_run") not in statuses:
+                continue
+            if not name.lower().startswith(prefix):
+                continue
+            if cutoff is not None:
+                last_run = rec and (rec["finished_at"] or rec["started_at"])
+                if not last_run or datetime.fromisoformat(last_run) < cutoff:
+                    continue
+            names.append(name)
+        offset = int(query.get("offset", 0))
+        page = names[offset:offset + int(query["limit"])]
+        return {
+            "accounts": page,
+            "history": {name: full["history"][name] for name in page if name in full["history"]},
+            "busy": full["busy"],
+            "total": len(names),
+            "version": full["version"],
+        }
+
+    def ranks(self, query):
+        rows = [
+            {"initiativename": f"Initiative {i:05d}", "rank": i + 1}
+            for i in range(self.ranks_rows)
+        ]
+        if not (self.paged_ranks and "limit" in query):
+            return {"rows": rows}
+        needle = query.get("search", "").lower()
+        if needle:
+            rows = [r for r in rows if needle in r["initiativename"].lower()]
+        offset = int(query.get("offset", 0))
+        return {"rows": rows[offset:offset + int(query["limit"])], "total": len(rows)}
+
+    def respond(self, method, endpoint, query, body, headers):
+        """``(status, payload, extra headers)``; payload is bytes or JSON-able."""
+        if endpoint == "validate_path":
+            return 200, {"ds_root": "/data/stub", "customer_name": "Stub Customer"}, {}
+        if endpoint == "accountnames":
+            return 200, {"accounts": self.accounts}, {}
+        if endpoint == "batch_types":
+            etag = f'"t{self.batch_types_version}"'
+            if headers.get("If-None-Match") == etag:
+                return 304, b"", {"ETag": etag}
+            return 200, {"batch_types": self.batch_types, "version": self.batch_types_version}, {"ETag": etag}
+        if endpoint == "batch_account_history":
+            paged = self.paged_history and "limit" in query
+            etag = f'"h{self.history_version}"'
+            if paged:
+                # Each filtered page is its own resource.
+                view = sorted((k, v) for k, v in query.items() if k not in ("customer_id", "since_version"))
+                etag = f'"h{self.history_version}-{hashlib.sha1(repr(view).encode()).hexdigest()[:8]}"'
+            if headers.get("If-None-Match") == etag:
+                return 304, b"", {"ETag": etag}
+            if paged:
+                return 200, self.history_page(query.get("batch_type", ""), query), {"ETag": etag}
+            return 200, self.history(query.get("batch_type", "")), {"ETag": etag}
+        if endpoint == "ranks_table":
+            return 200, self.ranks(query), {}
+        if endpoint in ("update_ranks", "update_recommendations"):
+            rows = (json.loads(body or b"{}") or {}).get("rows") or []
+            return 200, {"success": True, "updated": len(rows), "updated_rows": len(rows), "periodid": 42}, {}
+        if endpoint == "start_batch":
+            accounts = json.loads(parse_qs(body.decode()).get("accounts", ["[]"])[0])
+            with self._lock:
+                self.history_version += 1
+            return 200, {
+                "success": True,
+                "batch_id": int(time.time()),
+                "accounts_resolved": len(accounts),
+                "accounts_unresolved": [],
+                "scripts": 3,
+                "mode": parse_qs(body.decode()).get("mode", [None])[0],
+            }, {}
+        if endpoint == "upload_contacts":
+            return 200, {"success": True, "rows": body.count(b"\n")}, {}
+        if endpoint == "upload_contacts_start":
+            upload_id = uuid.uuid4().hex
+            with self._lock:
+                self.uploads[upload_id] = 0
+            return 200, {"upload_id": upload_id, "offset": 0}, {}
+        if endpoint == "upload_contacts_chunk":
+            upload_id = query.get("upload_id")
+            with self._lock:
+                if upload_id not in self.uploads:
+                    return 404, {"detail": "unknown upload"}, {}
+                if int(query.get("offset", -1)) == self.uploads[upload_id]:
+                    self.uploads[upload_id] += len(body)
+                return 200, {"offset": self.uploads[upload_id]}, {}
+        if endpoint == "upload_contacts_status":
+            with self._lock:
+                if query.get("upload_id") not in self.uploads:
+                    return 404, {"detail": "unknown upload"}, {}
+                return 200, {"offset": self.uploads[query["upload_id"]]}, {}
+        if endpoint == "upload_contacts_finish":
+            upload_id = parse_qs(body.decode()).get("upload_id", [None])[0]
+            with self._lock:
+                size = self.uploads.pop(upload_id, None)
+            if size is None:
+                return 404, {"detail": "unknown upload"}, {}
+            return 200, {"success": True, "bytes": size}, {}
+        if endpoint == "refreshconfig":
+            return 200, {"success": True}, {}
+        if endpoint == "config_status":
+            return 200, {"progress": 0.5, "status": "generating"}, {}
+        if endpoint in EXPORTS:
+            if headers.get("If-None-Match") == self.download_etag:
+                return 304, b"", {"ETag": self.download_etag}
+            return 200, self.download, {
+                "ETag": self.download_etag,
+                "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            }
+        return 404, {"detail": f"unknown endpoint {endpoint}"}, {}
+
+    def _handler(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._serve("get")
+
+            def do_POST(self):
+                self._serve("post")
+
+            def _serve(self, method):
+                url = urlparse(self.path)
+                endpoint = url.path.rsplit("/api/", 1)[-1]
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                with backend._lock:
+                    backend.counts[endpoint] = backend.counts.get(endpoint, 0) + 1
+                delay = backend.endpoint_latency_ms.get(endpoint, backend.latency_ms)
+                if delay:
+                    time.sleep(delay / 1000)
+                with backend._lock:
+                    failure = backend.failures.get(endpoint)
+                    if failure and failure[0] > 0:
+                        failure[0] -= 1
+                    else:
+                        failure = None
+                if failure is None or failure[2]:
+                    status, payload, extra = backend.respond(method, endpoint, query, body, self.headers)
+                if failure is not None:
+                    status, payload, extra = failure[1], {"detail": "injected failure"}, {}
+                raw = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                headers = {"Content-Type": "application/json", **extra}
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if status != 304:
+                    self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(raw)
+
+        return Handler
+
+
+def parse_endpoint_latency(values):
+    latency = {}
+    for value in values or []:
+        endpoint, _, ms = value.partition("=")
+        latency[endpoint] = float(ms)
+    return latency
+
+
+def add_backend_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added to every response")
+    parser.add_argument(
+        "--endpoint-latency", action="append", metavar="ENDPOINT=MS",
+        help="per-endpoint delay, overrides --latency-ms (repeatable)",
+    )
+    parser.add_argument("--accounts", type=int, default=20, help="accounts per customer")
+    parser.add_argument("--ranks-rows", type=int, default=200, help="initiatives returned by ranks_table")
+    parser.add_argument("--download-kb", type=int, default=512, help="size of each export")
+    parser.add_argument("--busy-every", type=int, default=5, help="every n-th account is running (0: none)")
+    parser.add_argument(
+        "--no-paged-history", dest="paged_history", action="store_false",
+        help="ignore the history paging parameters and always send every account",
+    )
+    parser.add_argument(
+        "--no-paged-ranks", dest="paged_ranks", action="store_false",
+        help="ignore the ranks_table paging parameters and always send every initiative",
+    )
+
+
+def backend_from_args(args, port=0):
+    return StubBackend(
+        port=port,
+        latency_ms=args.latency_ms,
+        endpoint_latency_ms=parse_endpoint_latency(args.endpoint_latency),
+        accounts=args.accounts,
+        ranks_rows=args.ranks_rows,
+        download_kb=args.download_kb,
+        busy_every=args.busy_every,
+        paged_history=args.paged_history,
+        paged_ranks=args.paged_ranks,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    add_backend_arguments(parser)
+    args = parser.parse_args()
+    backend = backend_from_args(args, port=args.port).start()
+    print(f"Stub backend on {backend.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        backend.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,31 @@
+import cProfile
+import functools
+import gzip
+import hashlib
+import io
 import json
+import marshal
 import os
+import pstats
 import requests
 import streamlit as st
 import logging
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from http.cookiejar import DefaultCookiePolicy
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.request import ACCEPT_ENCODING
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+try:
+    import orjson  # optional: faster JSON for the compact wire format
+except ImportError:
+    orjson = None
 
 # --- Configuration ---
 logging.basicConfig(
@@ -12,105 +34,292 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+@st.cache_resource
+def load_environment():
+    """Read .env once per process; later reruns find it in os.environ."""
+    return load_dotenv()
+
+
+load_environment()
 API_BASE = os.getenv("API_BASE")
 API_KEY = os.getenv("RM_API_KEY")
 HEADERS = {"Authorization": f"Bearer {API_KEY}"}
 
-# --- Streamlit Page Setup ---
-st.set_page_config(
-    page_title="CSM Backend Portal - Next Quarter",
-    layout="wide",
-    initial_sidebar_state="expanded"
+# Connection pool to API_BASE shared by every session in this process.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+DEFAULT_TIMEOUT = 30
+# The Excel exports are generated on request and take far longer than the
+# JSON endpoints, so they get their own read timeouts.
+ENDPOINT_TIMEOUTS = {
+    "download_usage_tracking": 120,
+    "download_products_excel": 60,
+    "download_recommendations_template": 60,
+}
+
+# Excel exports are streamed to a temp file: kept in memory up to
+# DOWNLOAD_SPOOL_BYTES, rolled over to disk beyond that, refused past the cap.
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_SPOOL_BYTES = 4 * 1024 * 1024
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_MB", "200")) * 1024 * 1024
+
+# Generated exports are kept in an on-disk cache shared by all sessions:
+# served as-is for ARTIFACT_FRESH_SECONDS, revalidated with the server's
+# ETag/Last-Modified after that. ARTIFACT_CACHE_MB=0 turns it off.
+ARTIFACT_CACHE_DIR = os.getenv(
+    "ARTIFACT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "csm_portal_artifacts")
+)
+ARTIFACT_CACHE_MAX_BYTES = int(os.getenv("ARTIFACT_CACHE_MB", "512")) * 1024 * 1024
+ARTIFACT_FRESH_SECONDS = int(os.getenv("ARTIFACT_FRESH_SECONDS", "900"))
+
+# Uploaded rank/recommendation workbooks with more data rows are rejected.
+EXCEL_MAX_ROWS = int(os.getenv("EXCEL_MAX_ROWS", "100000"))
+
+# The manual rank editor shows this many initiatives per page.
+RANKS_PAGE_SIZE = int(os.getenv("RANKS_PAGE_SIZE", "200"))
+
+# Contact CSVs at least this big are uploaded in gzip-compressed chunks that
+# can resume from the server's offset after a failure.
+CONTACTS_CHUNKED_MIN_BYTES = int(os.getenv("CONTACTS_CHUNKED_MIN_MB", "4")) * 1024 * 1024
+CONTACTS_CHUNK_BYTES = 1024 * 1024
+CONTACTS_CHUNK_RETRIES = 3
+CONTACTS_RETRY_DELAY = 1.0  # seconds before the first retry, doubled each time
+
+# Opt-in: start the quick-action exports in the background right after a
+# connect. This sets the default of the checkbox on the connect form.
+PREFETCH_EXPORTS = os.getenv("PORTAL_PREFETCH_EXPORTS", "0") == "1"
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+# Prefetched exports a session has not looked at for PREFETCH_IDLE_SECONDS
+# (it ended or moved on) are dropped by a sweep every PREFETCH_SWEEP_SECONDS.
+PREFETCH_IDLE_SECONDS = int(os.getenv("PREFETCH_IDLE_SECONDS", "600"))
+PREFETCH_SWEEP_SECONDS = 60
+QUICK_ACTION_EXPORTS = ("download_usage_tracking", "download_products_excel")
+
+# Threads for independent API calls issued together (e.g. the connect handshake).
+IO_POOL_WORKERS = int(os.getenv("IO_POOL_WORKERS", "16"))
+# Threads for workspace connects added in the background. They wait on calls
+# they issue on the I/O pool, so they must not run on it themselves.
+WORKSPACE_CONNECT_WORKERS = int(os.getenv("WORKSPACE_CONNECT_WORKERS", "4"))
+
+# Customer bootstrap data (validate_path + accountnames) is shared across
+# sessions for this many seconds, for at most this many customers.
+BOOTSTRAP_CACHE_TTL = int(os.getenv("BOOTSTRAP_CACHE_TTL", "600"))
+BOOTSTRAP_CACHE_SIZE = int(os.getenv("BOOTSTRAP_CACHE_SIZE", "128"))
+
+# Batch definitions are shared across sessions per customer. Once an entry is
+# this many seconds old, the next read revalidates it in the background.
+BATCH_TYPES_REVALIDATE = int(os.getenv("BATCH_TYPES_REVALIDATE", "60"))
+
+# Batch history table page size, and how many account-search matches the
+# run picker offers at once (without a search it offers the history page).
+BATCH_HISTORY_PAGE_SIZE = int(os.getenv("BATCH_HISTORY_PAGE_SIZE", "100"))
+BATCH_ACCOUNT_MATCHES = int(os.getenv("BATCH_ACCOUNT_MATCHES", "50"))
+
+# The launch queue checks whether queued accounts have freed up this often.
+LAUNCH_QUEUE_POLL = int(os.getenv("LAUNCH_QUEUE_POLL", "10"))
+# Launch notices nobody has read for this many seconds are dropped.
+LAUNCH_NOTICE_IDLE_SECONDS = int(os.getenv("LAUNCH_NOTICE_IDLE_SECONDS", "3600"))
+
+# Wire format for JSON calls. "compact" encodes with orjson when installed
+# (`pip install orjson`; not in requirements.txt, json is used otherwise),
+# gzips request bodies of at least GZIP_REQUEST_MIN_BYTES and asks for every
+# response encoding urllib3 can decode; "standard" is plain requests.
+WIRE_FORMAT = os.getenv("PORTAL_WIRE_FORMAT", "standard")
+GZIP_REQUEST_MIN_BYTES = 8 * 1024
+
+# Request/render metrics in Prometheus text format: rewritten to
+# PORTAL_METRICS_FILE every PORTAL_METRICS_INTERVAL seconds when set, and shown
+# on the admin view at ?admin=<PORTAL_ADMIN_TOKEN> when a token is set.
+METRICS_FILE = os.getenv("PORTAL_METRICS_FILE")
+METRICS_FILE_INTERVAL = int(os.getenv("PORTAL_METRICS_INTERVAL", "15"))
+ADMIN_TOKEN = os.getenv("PORTAL_ADMIN_TOKEN")
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+# The tabs' heavy libraries (pandas and pyarrow for tables, openpyxl for
+# uploads) are imported on a background thread as soon as the process serves
+# its first session, so nobody waits for them in the middle of an
+# interaction. PORTAL_WARMUP=0 turns this off.
+WARMUP_IMPORTS = os.getenv("PORTAL_WARMUP", "1") != "0"
+
+# Theme CSS, read once per process.
+THEME_CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "theme.css")
+
+# PORTAL_PROFILE=1 runs every rerun under cProfile and keeps the last
+# PORTAL_PROFILE_KEEP profiles for download (sidebar and admin view).
+PROFILE_RERUNS = os.getenv("PORTAL_PROFILE", "0") == "1"
+PROFILE_KEEP = int(os.getenv("PORTAL_PROFILE_KEEP", "20"))
+
+# Lazy navigation runs only the selected section on a rerun; set
+# PORTAL_LAZY_NAV=0 to go back to st.tabs, which executes every tab.
+LAZY_NAV = os.getenv("PORTAL_LAZY_NAV", "1") != "0"
+
+# --- Rerun profiling ---
+# Where a function's own time goes: by the package it lives in, or else by
+# whoever called it (stdlib helpers and builtins count for their caller).
+_PROFILE_CATEGORIES = (
+    ("network", ("requests", "urllib3", "http", "ssl.py", "socket.py", "concurrent")),
+    ("pandas", ("pandas", "numpy", "pyarrow", "openpyxl")),
+    ("widgets", ("streamlit",)),
 )
+_PROFILE_BUILTIN_NETWORK = ("_socket", "_ssl")
+
+
+def _profile_category(func):
+    filename, _, name = func
+    if filename == "~":
+        return "network" if any(m in name for m in _PROFILE_BUILTIN_NETWORK) else None
+    if os.path.abspath(filename) == os.path.abspath(__file__):
+        return "script"
+    parts = filename.replace("\\", "/").split("/")
+    for category, packages in _PROFILE_CATEGORIES:
+        if any(p in parts for p in packages):
+            return category
+    return None
 
-st.markdown("""
-<style>
-/* Brand accent you can reuse */
-:root, .stApp { --brand: #00c951; }
 
-/* Respect Streamlit theme (no 'force light', no !important) */
-.stApp {
-  background: var(--background-color);
-  color: var(--text-color);
-}
-.block-container { padding-top: 2rem; padding-bottom: 2rem; }
-
-/* Inputs */
-.stTextInput input,
-.stSelectbox [role="combobox"],
-.stNumberInput input,
-.stFileUploader {
-  background: var(--secondary-background-color);
-  color: var(--text-color);
-  border-radius: 8px;
-}
+def split_profile_time(stats):
+    """Split the profiled time into network / pandas / widgets / script.
 
-/* Buttons — keep to theme colors and avoid !important */
-/* Buttons — use brand directly */
-.stButton > button:hover,
-.stButton > button:focus,
-.stButton > button:focus-visible {
-  background: var(--brand);
-  border: 1px solid var(--brand);
-  color: #ffffff;
-  filter: none;
-  box-shadow: none;
-  outline: none;
-}
+    `stats` is ``pstats.Stats.stats``. Every function's own time is charged
+    to its category, or shared among its callers' categories in proportion
+    to the time each caller spent in it, so the parts add up to the total.
+    """
+    shares_of = {}
+
+    def shares(func):
+        category = _profile_category(func)
+        if category:
+            return {category: 1.0}
+        if func in shares_of:
+            return shares_of[func]
+        shares_of[func] = {"script": 1.0}  # guards against call cycles
+        callers = stats[func][4] if func in stats else {}
+        total = sum(edge[3] for edge in callers.values())
+        if total <= 0:
+            return shares_of[func]
+        result = {}
+        for caller, edge in callers.items():
+            for category, share in shares(caller).items():
+                result[category] = result.get(category, 0.0) + share * edge[3] / total
+        shares_of[func] = result
+        return result
+
+    split = {"network": 0.0, "pandas": 0.0, "widgets": 0.0, "script": 0.0}
+    for func, (_, _, tottime, _, _) in stats.items():
+        for category, share in shares(func).items():
+            split[category] += tottime * share
+    return split
+
+
+class RerunProfiler:
+    """Profiles whole script reruns and keeps the last `keep` of them.
+
+    Only one rerun is profiled at a time (a profiler can be process-wide on
+    newer Pythons); reruns that overlap it are counted as skipped.
+    """
 
-.stButton > button:active { transform: translateY(1px); }
+    def __init__(self, keep):
+        self.profiles = deque(maxlen=keep)
+        self.skipped = 0
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not self._busy.acquire(blocking=False):
+            with self._lock:
+                self.skipped += 1
+            return None
+        ctx = get_script_run_ctx()
+        profiler = cProfile.Profile()
+        handle = {
+            "session_id": ctx.session_id[:8] if ctx else "",
+            "started_at": time.time(),
+            "started": time.perf_counter(),
+            "profiler": profiler,
+        }
+        profiler.enable()
+        return handle
+
+    def finish(self, handle):
+        profiler = handle["profiler"]
+        profiler.disable()
+        wall = time.perf_counter() - handle["started"]
+        self._busy.release()
+        profiler.create_stats()
+        split = split_profile_time(profiler.stats)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(25)
+        with self._lock:
+            self.profiles.append({
+                "session_id": handle["session_id"],
+                "started_at": handle["started_at"],
+                "wall": wall,
+                **split,
+                "top": text.getvalue(),
+                "dump": marshal.dumps(profiler.stats),
+            })
+
+    def summary(self):
+        with self._lock:
+            profiles = list(self.profiles)
+        return [
+            {
+                "Started": time.strftime("%H:%M:%S", time.localtime(p["started_at"])),
+                "Session": p["session_id"],
+                "Wall (ms)": round(p["wall"] * 1000),
+                "Network (ms)": round(p["network"] * 1000),
+                "Pandas (ms)": round(p["pandas"] * 1000),
+                "Widgets (ms)": round(p["widgets"] * 1000),
+                "Script (ms)": round(p["script"] * 1000),
+            }
+            for p in reversed(profiles)
+        ], list(reversed(profiles))
+
+
+@st.cache_resource
+def get_rerun_profiler():
+    return RerunProfiler(PROFILE_KEEP)
+
+
+# --- Startup ---
+def _warm_dependencies():
+    started = time.perf_counter()
+    try:
+        import openpyxl  # noqa: F401
+        import pandas as pd
+        import pyarrow as pa
+        # Also loads pyarrow's pandas conversion, which st.dataframe needs.
+        pa.Table.from_pandas(pd.DataFrame({"warmup": [1]}))
+    except Exception as e:
+        logger.warning(f"Dependency warm-up failed: {e}")
+        return
+    logger.info(f"Warmed up pandas, pyarrow and openpyxl in {(time.perf_counter() - started) * 1000:.0f} ms")
 
 
+@st.cache_resource
+def start_dependency_warmup():
+    thread = threading.Thread(target=_warm_dependencies, name="dependency-warmup", daemon=True)
+    thread.start()
+    return thread
 
-/* Tabs – underline style with brand accent, theme-aware borders/text */
-.stTabs [data-baseweb="tab-list"] {
-  gap: 18px;
-  border-bottom: 1px solid rgba(0,0,0,.12);
-}
-[data-theme="dark"] .stTabs [data-baseweb="tab-list"] {
-  border-bottom-color: rgba(255,255,255,.16);
-}
-.stTabs [data-baseweb="tab"] {
-  background: transparent;
-  border: none;
-  height: 44px;
-  padding: 0 6px;
-  color: var(--text-color);
-  opacity: .75;
-  font-weight: 600;
-  border-bottom: 2px solid transparent;
-  transition: color .15s ease, border-color .15s ease, opacity .15s ease;
-}
-.stTabs [data-baseweb="tab"]:hover {
-  opacity: 1;
-  border-bottom: 2px solid rgba(0,0,0,.12);
-}
-[data-theme="dark"] .stTabs [data-baseweb="tab"]:hover {
-  border-bottom-color: rgba(255,255,255,.16);
-}
-.stTabs [aria-selected="true"] {
-  color: var(--brand);
-  border-bottom: 2px solid var(--brand);
-  opacity: 1;
-}
 
-/* Sidebar labels */
-.sidebar-title {
-  font-weight: 700;
-  font-size: 0.9rem;
-  text-transform: uppercase;
-  letter-spacing: 0.04em;
-  color: rgba(0,0,0,.55);
-  margin-bottom: 0.25rem;
-}
-[data-theme="dark"] .sidebar-title { color: rgba(255,255,255,.6); }
-.sidebar-value { font-weight: 600; margin-bottom: 0.75rem; }
+@st.cache_resource
+def theme_css():
+    with open(THEME_CSS_PATH) as f:
+        return f"<style>{f.read()}</style>"
 
-/* Alerts */
-.stAlert { border-radius: 10px; }
-</style>
-""", unsafe_allow_html=True)
+
+# --- Streamlit Page Setup ---
+def setup_page():
+    if WARMUP_IMPORTS:
+        start_dependency_warmup()
+    st.set_page_config(
+        page_title="CSM Backend Portal - Next Quarter",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.html(theme_css())
+    initialize_session_state()
 
 
 # --- Session State ---
@@ -125,31 +334,42 @@ def initialize_session_state():
         'contact_upload_version': 0,
         'contact_upload_notice': None,
         'contact_upload_payload': None,
+        'contact_upload_resume': {},   # uploaded file id -> chunked upload state
+        'prefetched_exports': {},      # (customer_id, endpoint) -> finished prefetch file
         'rc_last_status': None,
         'rc_last_error': None,
         'rc_started_once': False,
+        'rc_monitors': {},             # customer_id -> config generation being monitored
         'confirm_ranks_pending': False,
         'recommend_upload_version': 0,
         'recommend_notice': None,
 
 
         # NEW for Update Ranks
-        'manual_rows': [],             # holds rows for manual entry
+        'ranks_page': None,            # the manual editor's page of initiatives
+        'ranks_changes': {},           # initiativename -> edited rank, across pages
+        'ranks_editor_version': 0,     # remounts the editor on a new page
+        'ranks_patch_rows': None,      # changed rows to send; None = full replace
         'ranks_upload_version': 0,     # remounts the Excel uploader after success
         'ranks_notice': None,          # one-shot success toast
 
         # Batch tabs (splitter / contacts / news) are built from the server's
-        # YAML configs; per-batch selection, mode and notice keys are created
-        # on demand in batch_tab() as `batch_*_<batch_type>`.
-        'batch_types': None,
-        'batch_types_customer': None,
+        # YAML configs (shared per customer by BatchTypesCache); per-batch
+        # selection, mode and notice keys are created on demand in batch_tab()
+        # as `batch_*_<batch_type>`.
+        'connect_timings': None,       # per-call wall time of the last connect
+
+        # Multi-customer workspace: connected customers with their saved
+        # per-customer state, and background connects still in flight.
+        'workspace': {},
+        'workspace_pending': {},
+        'workspace_errors': {},
     }
     for k, v in defaults.items():
         if k not in st.session_state:
             st.session_state[k] = v
 
 
-initialize_session_state()
 def _ensure_valid_account_selection(selectbox_key: str):
     accounts = st.session_state.get("account_names", []) or []
     if not accounts:
@@ -158,20 +378,959 @@ def _ensure_valid_account_selection(selectbox_key: str):
     if cur not in accounts:
         st.session_state[selectbox_key] = accounts[0]
 
+# --- Metrics ---
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus exposes one."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, n in zip(self.buckets, self.counts):
+            if n >= rank:
+                return bound
+        return None
+
+
+class PortalMetrics:
+    """Per-endpoint API and per-tab render metrics, shared process-wide.
+
+    ApiClient reports every request (latency, status, response size,
+    failures by kind); tabs report their render time through timed_render.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.latency = {}      # endpoint -> Histogram (seconds)
+        self.sizes = {}        # endpoint -> Histogram (bytes)
+        self.requests = {}     # (endpoint, status code or failure kind) -> count
+        self.errors = {}       # (endpoint, kind) -> count
+        self.renders = {}      # tab -> Histogram (seconds)
+
+    @staticmethod
+    def failure_kind(exc):
+        if isinstance(exc, requests.exceptions.Timeout):
+            return "timeout"
+        if isinstance(exc, requests.exceptions.ConnectionError):
+            return "connection"
+        if isinstance(exc, DownloadTooLargeError):
+            return "too_large"
+        return "other"
+
+    def observe_request(self, endpoint, seconds, status=None, size=None, exc=None):
+        """Record one request; `status` for a response, `exc` for a failure."""
+        outcome = str(status) if exc is None else self.failure_kind(exc)
+        kind = None
+        if exc is not None:
+            kind = outcome
+        elif status is not None and status >= 400:
+            kind = f"http_{status // 100}xx"
+        with self._lock:
+            self.latency.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            if size is not None:
+                self.sizes.setdefault(endpoint, Histogram(SIZE_BUCKETS)).observe(size)
+            self.requests[(endpoint, outcome)] = self.requests.get((endpoint, outcome), 0) + 1
+            if kind:
+                self.errors[(endpoint, kind)] = self.errors.get((endpoint, kind), 0) + 1
+
+    def observe_render(self, tab, seconds):
+        with self._lock:
+            self.renders.setdefault(tab, Histogram(LATENCY_BUCKETS)).observe(seconds)
+
+    def summary(self):
+        """One row per endpoint for the admin view."""
+        with self._lock:
+            rows = []
+            for endpoint, hist in sorted(self.latency.items()):
+                size = self.sizes.get(endpoint)
+                errors = {k: n for (e, k), n in self.errors.items() if e == endpoint}
+                rows.append({
+                    "Endpoint": endpoint,
+                    "Requests": hist.count,
+                    "Errors": sum(errors.values()),
+                    "Timeouts": errors.get("timeout", 0),
+                    "Mean (s)": round(hist.sum / hist.count, 3),
+                    "p50 ≤ (s)": hist.quantile(0.5),
+                    "p95 ≤ (s)": hist.quantile(0.95),
+                    "Mean size (KB)": round(size.sum / size.count / 1024, 1) if size and size.count else None,
+                })
+            renders = [
+                {
+                    "Tab": tab,
+                    "Renders": hist.count,
+                    "Mean (s)": round(hist.sum / hist.count, 3),
+                    "p50 ≤ (s)": hist.quantile(0.5),
+                    "p95 ≤ (s)": hist.quantile(0.95),
+                }
+                for tab, hist in sorted(self.renders.items())
+            ]
+            return rows, renders
+
+    def prometheus_text(self):
+        """The metrics in Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name, help_text, label, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for value, hist in sorted(series.items()):
+                for bound, n in zip(hist.buckets, hist.counts):
+                    lines.append(f'{name}_bucket{{{label}="{value}",le="{bound}"}} {n}')
+                lines.append(f'{name}_bucket{{{label}="{value}",le="+Inf"}} {hist.count}')
+                lines.append(f'{name}_sum{{{label}="{value}"}} {hist.sum}')
+                lines.append(f'{name}_count{{{label}="{value}"}} {hist.count}')
+
+        def counter(name, help_text, labels, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (endpoint, value), n in sorted(series.items()):
+                lines.append(f'{name}{{endpoint="{endpoint}",{labels}="{value}"}} {n}')
+
+        with self._lock:
+            histogram("portal_api_request_duration_seconds", "API request latency.",
+                      "endpoint", self.latency)
+            histogram("portal_api_response_bytes", "API response body size.",
+                      "endpoint", self.sizes)
+            counter("portal_api_requests_total", "API requests by status code or failure kind.",
+                    "code", self.requests)
+            counter("portal_api_errors_total", "Failed API requests by kind.",
+                    "kind", self.errors)
+            histogram("portal_tab_render_seconds", "Wall time of one tab render.",
+                      "tab", self.renders)
+        lines.append("# HELP portal_process_start_time_seconds Unix time the metrics were started.")
+        lines.append("# TYPE portal_process_start_time_seconds gauge")
+        lines.append(f"portal_process_start_time_seconds {self.started_at}")
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+def _write_metrics_file(metrics, path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            metrics.write_file(path)
+        except OSError as e:
+            logger.error(f"Could not write metrics to {path}: {e}")
+
+
+@st.cache_resource
+def get_metrics():
+    metrics = PortalMetrics()
+    if METRICS_FILE:
+        threading.Thread(
+            target=_write_metrics_file, args=(metrics, METRICS_FILE, METRICS_FILE_INTERVAL),
+            name="metrics-file", daemon=True,
+        ).start()
+    return metrics
+
+
+def timed_render(label=None):
+    """Record a tab's render time under `label(*args)`, or the function name."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                name = label(*args, **kwargs) if label else fn.__name__
+                get_metrics().observe_render(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
 # --- API Helper ---
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools report every new connection to `on_new_conn`.
+
+    Any request that did not open a connection was served from a pooled
+    keep-alive one, so the count gives the pool's misses.
+    """
+
+    def __init__(self, on_new_conn, **kwargs):
+        self._on_new_conn = on_new_conn
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_new_conn = self._on_new_conn
+
+        def counting(base):
+            class CountingPool(base):
+                def _new_conn(self):
+                    on_new_conn()
+                    return super()._new_conn()
+            return CountingPool
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": counting(HTTPConnectionPool),
+            "https": counting(HTTPSConnectionPool),
+        }
+
+
+class ApiClient:
+    """Keep-alive HTTP client for API_BASE, shared process-wide.
+
+    A single ``requests.Session`` holds a urllib3 pool per host, so repeated
+    calls from any session reuse an open TCP+TLS connection instead of doing a
+    fresh handshake on every rerun. Its cookie jar accepts nothing, since the
+    session is shared between users.
+    """
+
+    def __init__(self, base_url, headers, pool_size=HTTP_POOL_SIZE, metrics=None):
+        self.base_url = base_url
+        self.metrics = metrics
+        self.pool_connections = 4
+        self.pool_size = pool_size
+        self.requests_sent = 0
+        self.connections_opened = 0
+        self._count_lock = threading.Lock()
+        self.session = requests.Session()
+        # The session is shared by every CSM's session: never keep cookies
+        # one user's response set for another user's request.
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self.session.headers.update(headers)
+        self.adapter = CountingHTTPAdapter(
+            self._connection_opened, pool_connections=self.pool_connections, pool_maxsize=pool_size,
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def url(self, endpoint):
+        return f"{self.base_url}/api/{endpoint}"
+
+    def observe(self, endpoint, seconds, **kwargs):
+        """Record a request in `metrics`, when the client has any."""
+        if self.metrics is not None:
+            self.metrics.observe_request(endpoint, seconds, **kwargs)
+
+    def _connection_opened(self):
+        with self._count_lock:
+            self.connections_opened += 1
+
+    def request(self, method, endpoint, timeout=None, **kwargs):
+        """Send one request; non-streamed ones are recorded in `metrics`.
+
+        Streamed responses are recorded by their reader once the body is in.
+        """
+        if timeout is None:
+            timeout = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+        with self._count_lock:
+            self.requests_sent += 1
+        if self.metrics is None or kwargs.get("stream"):
+            return self.session.request(method, self.url(endpoint), timeout=timeout, **kwargs)
+        started = time.perf_counter()
+        try:
+            resp = self.session.request(method, self.url(endpoint), timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self.metrics.observe_request(endpoint, time.perf_counter() - started, exc=e)
+            raise
+        self.metrics.observe_request(
+            endpoint, time.perf_counter() - started, status=resp.status_code, size=len(resp.content),
+        )
+        return resp
+
+    def pool_stats(self):
+        """Requests vs. new connections, plus the pool settings.
+
+        Every connection the pools had to open is a miss; any other request
+        was served from a pooled keep-alive connection (a hit).
+        """
+        with self._count_lock:
+            sent = self.requests_sent
+            opened = self.connections_opened
+        hits = max(sent - opened, 0)
+        return {
+            "base_url": self.base_url,
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": self.pool_size,
+            "max_retries": self.adapter.max_retries.total,
+            "requests": sent,
+            "hits": hits,
+            "misses": opened,
+            "hit_rate": hits / sent if sent else 0.0,
+        }
+
+
+@st.cache_resource
+def get_api_client():
+    return ApiClient(API_BASE, HEADERS, metrics=get_metrics())
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and time.monotonic() - item[0] < self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+@st.cache_resource
+def get_bootstrap_cache():
+    return TTLCache(BOOTSTRAP_CACHE_SIZE, BOOTSTRAP_CACHE_TTL)
+
+
+@st.cache_resource
+def get_io_pool():
+    """Shared thread pool for fanning out independent API calls."""
+    return ThreadPoolExecutor(max_workers=IO_POOL_WORKERS, thread_name_prefix="api-io")
+
+
+@st.cache_resource
+def get_workspace_pool():
+    """Background workspace connects; kept off the I/O pool they wait on."""
+    return ThreadPoolExecutor(max_workers=WORKSPACE_CONNECT_WORKERS, thread_name_prefix="workspace-connect")
+
+
+def dumps_json(obj):
+    """Compact JSON bytes; orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":"), default=str).encode()
+
+
+def loads_json(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _encode_request(endpoint, kwargs, compact):
+    """Encode a ``json=`` body ourselves so its size and encode time are logged.
+
+    Standard encodes exactly like requests does; compact uses dumps_json,
+    gzips bodies of at least GZIP_REQUEST_MIN_BYTES and advertises every
+    response encoding urllib3 can decode.
+    """
+    kwargs = dict(kwargs)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if compact:
+        headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+    if "json" in kwargs:
+        started = time.perf_counter()
+        payload = kwargs.pop("json")
+        try:
+            if compact:
+                body = dumps_json(payload)
+            else:
+                body = json.dumps(payload, allow_nan=False).encode("utf-8")
+        except (TypeError, ValueError) as e:
+            # Same failure requests itself reports for an unencodable body.
+            raise requests.exceptions.InvalidJSONError(e)
+        raw_size = len(body)
+        headers["Content-Type"] = "application/json"
+        if compact and raw_size >= GZIP_REQUEST_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        logger.info(
+            f"{endpoint} body ({'compact' if compact else 'standard'}): {raw_size:,} B JSON, "
+            f"{len(body):,} B sent, encoded in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        kwargs["data"] = body
+    if headers:
+        kwargs["headers"] = headers
+    return kwargs
+
+
+def call_api(method, endpoint, wire=None, client=None, **kwargs):
+    """make_api_request without the UI: returns ``(data, error message)``.
+
+    Makes no Streamlit calls, so it is safe on pool threads, which pass the
+    shared `client` in. `wire` picks the wire format for this call
+    ("standard" or "compact"); it defaults to PORTAL_WIRE_FORMAT so the two
+    can be compared per request.
+    """
+    client = client or get_api_client()
+    url = client.url(endpoint)
+    compact = (wire or WIRE_FORMAT) == "compact"
+    try:
+        kwargs = _encode_request(endpoint, kwargs, compact)
+        resp = client.request(method, endpoint, **kwargs)
+        resp.raise_for_status()
+        return (loads_json(resp.content) if compact else resp.json()), None
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"HTTP Error for {url}: {e}")
+        return None, f"HTTP Error: {e.response.status_code} - {e.response.text}"
+    except requests.exceptions.RequestException as e:
+        logger.error(f"API request failed for {url}: {e}")
+        return None, f"API Request Failed: {e}"
+    except ValueError as e:
+        # loads_json's decode errors; resp.json() raises a RequestException.
+        logger.error(f"Invalid JSON from {url}: {e}")
+        return None, "Invalid JSON from server"
+
+
+def timed_api_call(method, endpoint, **kwargs):
+    """call_api plus its wall time: ``(data, error message, seconds)``."""
+    started = time.perf_counter()
+    data, error = call_api(method, endpoint, **kwargs)
+    return data, error, time.perf_counter() - started
+
+
 def make_api_request(method, endpoint, **kwargs):
-    url = f"{API_BASE}/api/{endpoint}"
+    data, error = call_api(method, endpoint, **kwargs)
+    if error:
+        st.error(error)
+    return data
+
+
+def conditional_call(endpoint, params=None, etag=None, client=None):
+    """GET `endpoint`, revalidating a previously fetched copy.
+
+    Sends If-None-Match when an ETag is known; a 304 (or a body carrying
+    ``"unchanged": true`` for servers that use a version cursor instead) comes
+    back as ``(False, None, etag)`` without decoding anything. Otherwise the
+    result is ``(True, data, etag)``. Returns ``(result, error message)`` and,
+    like call_api, makes no Streamlit calls; pool threads pass `client` in.
+    """
+    client = client or get_api_client()
+    url = client.url(endpoint)
+    headers = {"If-None-Match": etag} if etag else None
     try:
-        resp = requests.request(method, url, headers=HEADERS, timeout=30, **kwargs)
+        resp = client.request("get", endpoint, params=params, headers=headers)
+        if resp.status_code == 304:
+            return (False, None, etag), None
         resp.raise_for_status()
-        return resp.json()
+        data = resp.json()
     except requests.exceptions.HTTPError as e:
-        st.error(f"HTTP Error: {e.response.status_code} - {e.response.text}")
         logger.error(f"HTTP Error for {url}: {e}")
+        return None, f"HTTP Error: {e.response.status_code} - {e.response.text}"
     except requests.exceptions.RequestException as e:
-        st.error(f"API Request Failed: {e}")
         logger.error(f"API request failed for {url}: {e}")
-    return None
+        return None, f"API Request Failed: {e}"
+    new_etag = resp.headers.get("ETag") or etag
+    if isinstance(data, dict) and data.get("unchanged"):
+        return (False, None, new_etag), None
+    return (True, data, new_etag), None
+
+
+def make_conditional_request(endpoint, params=None, etag=None):
+    """conditional_call, reporting errors like make_api_request (returns None)."""
+    result, error = conditional_call(endpoint, params=params, etag=etag)
+    if error:
+        st.error(error)
+    return result
+
+
+class DownloadTooLargeError(requests.exceptions.RequestException):
+    """The export is bigger than DOWNLOAD_MAX_BYTES."""
+
+
+class ArtifactCache:
+    """Content-addressed, size-bounded LRU cache of exported files on disk.
+
+    Blobs are stored once under the SHA-256 of their content; the index maps a
+    request (endpoint + params) to a blob plus the server's validators. The
+    index is saved next to the blobs so a restarted process keeps its cache.
+    """
+
+    def __init__(self, root, max_bytes, fresh_seconds):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(root, "index.json")
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        self._index = OrderedDict()  # request key -> metadata, least recent first
+        try:
+            with open(self._index_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = []
+        for key, meta in saved:
+            if os.path.exists(self._blob_path(meta["sha256"])):
+                self._index[key] = meta
+
+    @staticmethod
+    def request_key(endpoint, params):
+        raw = json.dumps([endpoint, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.root, "blobs", f"{sha256}.bin")
+
+    def lookup(self, key):
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is not None:
+                self._index.move_to_end(key)
+            return dict(meta) if meta else None
+
+    def is_fresh(self, meta):
+        return time.time() - meta["fetched_at"] < self.fresh_seconds
+
+    def open(self, key, touch=False):
+        """Open the blob cached for `key`, or return None if there is none.
+
+        The file is opened under the lock, so a concurrent eviction cannot
+        remove it first; the open handle keeps reading after an unlink. A blob
+        that has gone missing (e.g. a tmp cleaner) drops its entry. `touch`
+        means the server confirmed the copy (304): restart its freshness window.
+        """
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+            try:
+                f = open(self._blob_path(meta["sha256"]), "rb")
+            except FileNotFoundError:
+                del self._index[key]
+                self._save()
+                return None
+            self._index.move_to_end(key)
+            if touch:
+                meta["fetched_at"] = time.time()
+                self._save()
+            return f
+
+    def store(self, key, src, etag=None, last_modified=None):
+        """Copy `src` into the cache and return the stored metadata."""
+        digest = hashlib.sha256()
+        src.seek(0)
+        for chunk in iter(lambda: src.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        sha256 = digest.hexdigest()
+        blob = self._blob_path(sha256)
+        size = src.tell()
+        if not os.path.exists(blob):
+            fd, tmp = tempfile.mkstemp(dir=self.root)
+            with os.fdopen(fd, "wb") as out:
+                src.seek(0)
+                for chunk in iter(lambda: src.read(DOWNLOAD_CHUNK_SIZE), b""):
+                    out.write(chunk)
+            os.replace(tmp, blob)
+        meta = {
+            "sha256": sha256,
+            "size": size,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        with self._lock:
+            self._index[key] = meta
+            self._index.move_to_end(key)
+            self._evict()
+            self._save()
+        return dict(meta)
+
+    def invalidate(self, key):
+        with self._lock:
+            meta = self._index.pop(key, None)
+            if meta:
+                self._drop_blob_if_unused(meta["sha256"])
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            blobs = {m["sha256"]: m["size"] for m in self._index.values()}
+            return {"entries": len(self._index), "blobs": len(blobs), "bytes": sum(blobs.values())}
+
+    def _evict(self):
+        blobs = {m["sha256"]: m["size"] for m in self._index.values()}
+        total = sum(blobs.values())
+        while total > self.max_bytes and len(self._index) > 1:
+            _, meta = self._index.popitem(last=False)
+            if self._drop_blob_if_unused(meta["sha256"]):
+                total -= meta["size"]
+
+    def _drop_blob_if_unused(self, sha256):
+        if any(m["sha256"] == sha256 for m in self._index.values()):
+            return False
+        try:
+            # Sessions still holding the blob open keep reading it after unlink.
+            os.remove(self._blob_path(sha256))
+        except OSError:
+            pass
+        return True
+
+    def _save(self):
+        fd, tmp = tempfile.mkstemp(dir=self.root)
+        with os.fdopen(fd, "w") as f:
+            json.dump(list(self._index.items()), f)
+        os.replace(tmp, self._index_path)
+
+
+@st.cache_resource
+def get_artifact_cache():
+    if ARTIFACT_CACHE_MAX_BYTES <= 0:
+        return None
+    return ArtifactCache(ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES, ARTIFACT_FRESH_SECONDS)
+
+
+def _stream_export(client, endpoint, params, on_progress=None, headers=None):
+    """Stream an export into a spooled temp file.
+
+    Returns ``(file, response headers)``, with the file rewound, or
+    ``(None, headers)`` when the server answers 304 to a conditional request.
+    """
+    limit_mb = DOWNLOAD_MAX_BYTES // (1024 * 1024)
+    out = tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_BYTES)
+    started = time.perf_counter()
+    received = 0
+    status = None
+    try:
+        with client.request(
+            "get", endpoint, params=params, headers=headers, stream=True
+        ) as resp:
+            status = resp.status_code
+            if resp.status_code == 304:
+                out.close()
+                client.observe(endpoint, time.perf_counter() - started, status=304, size=0)
+                return None, resp.headers
+            resp.raise_for_status()
+            total = int(resp.headers.get("Content-Length") or 0)
+            if total > DOWNLOAD_MAX_BYTES:
+                raise DownloadTooLargeError(f"File is larger than the {limit_mb} MB limit.")
+            for chunk in resp.iter_content(DOWNLOAD_CHUNK_SIZE):
+                received += len(chunk)
+                if received > DOWNLOAD_MAX_BYTES:
+                    raise DownloadTooLargeError(f"File is larger than the {limit_mb} MB limit.")
+                out.write(chunk)
+                if on_progress and total:
+                    on_progress(received, total)
+    except requests.exceptions.HTTPError:
+        out.close()
+        client.observe(endpoint, time.perf_counter() - started, status=status, size=received)
+        raise
+    except requests.exceptions.RequestException as e:
+        out.close()
+        client.observe(endpoint, time.perf_counter() - started, size=received, exc=e)
+        raise
+    except BaseException:
+        out.close()
+        raise
+    client.observe(endpoint, time.perf_counter() - started, status=status, size=received)
+    out.seek(0)
+    return out, resp.headers
+
+
+_SHARED = object()
+
+
+def download_to_file(endpoint, params, on_progress=None, force=False, client=None, cache=_SHARED):
+    """Fetch an export as a readable file, through the artifact cache.
+
+    A cached copy inside its freshness window is returned without contacting
+    the server; an older one is revalidated with If-None-Match /
+    If-Modified-Since. `force` skips the cache and asks the server for a
+    freshly generated file.
+
+    Safe to call off the script thread: it touches no Streamlit elements and
+    reports progress through ``on_progress(received, total)`` when the server
+    sends Content-Length. Raises DownloadTooLargeError (a RequestException,
+    like any other failed download) once the body exceeds DOWNLOAD_MAX_BYTES.
+    Pool threads pass the shared `client` and `cache` (None: no cache) in,
+    since they have no script run context to look them up with.
+    """
+    if client is None:
+        client = get_api_client()
+    if cache is _SHARED:
+        cache = get_artifact_cache()
+    if cache is None:
+        return _stream_export(client, endpoint, params, on_progress)[0]
+
+    key = cache.request_key(endpoint, params)
+    meta = None if force else cache.lookup(key)
+    if meta and cache.is_fresh(meta):
+        cached = _open_cached(cache, key)
+        if cached is not None:
+            return cached
+        meta = None
+
+    headers = {}
+    if meta and meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta and meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    if force:
+        headers["Cache-Control"] = "no-cache"
+
+    export, resp_headers = _stream_export(client, endpoint, params, on_progress, headers or None)
+    if export is None:
+        cached = _open_cached(cache, key, touch=True)
+        if cached is not None:
+            return cached
+        # The copy the server confirmed is gone: fetch it again, unconditionally.
+        export, resp_headers = _stream_export(client, endpoint, params, on_progress)
+    try:
+        cache.store(
+            key, export,
+            etag=resp_headers.get("ETag"),
+            last_modified=resp_headers.get("Last-Modified"),
+        )
+    except OSError as e:
+        # A full or unwritable cache dir must not break the download itself.
+        logger.error(f"Could not cache {endpoint} export: {e}")
+        export.seek(0)
+        return export
+    cached = _open_cached(cache, key)
+    if cached is None:
+        export.seek(0)
+        return export
+    export.close()
+    return cached
+
+
+def _open_cached(cache, key, touch=False):
+    """cache.open, treating an unreadable cache like a miss (the entry is dropped)."""
+    try:
+        return cache.open(key, touch=touch)
+    except OSError as e:
+        logger.error(f"Could not read cached export {key}: {e}")
+        try:
+            cache.invalidate(key)
+        except OSError:
+            pass
+        return None
+
+
+def stream_download(endpoint, params):
+    """download_to_file with a progress bar driven by Content-Length.
+
+    Honours the sidebar's "Regenerate exports" switch.
+    """
+    bar = None
+
+    def show(received, total):
+        nonlocal bar
+        if bar is None:
+            bar = st.progress(0.0, text="Downloading...")
+        bar.progress(
+            min(received / total, 1.0),
+            text=f"Downloading... {received // 1024:,} / {total // 1024:,} KB",
+        )
+
+    export = download_to_file(
+        endpoint, params, on_progress=show,
+        force=st.session_state.get("regenerate_exports", False),
+    )
+    if bar is not None:
+        bar.empty()
+    return export
+
+
+def file_download_data(f):
+    """`data` for st.download_button that reads `f` only when clicked.
+
+    The bytes never sit in session state; the file is closed once the button
+    is gone and the callable is garbage collected.
+    """
+    def read():
+        f.seek(0)
+        return f.read()
+    return read
+
+
+class ExportPrefetcher:
+    """Bounded background pool that prepares exports ahead of the click.
+
+    Jobs are tracked per Streamlit session. A session takes a finished export
+    over into its own state; jobs a session has not looked at for
+    `idle_seconds` are swept by a timer thread, so abandoned results are
+    cancelled or closed (removing their temp files) instead of piling up.
+    """
+
+    def __init__(self, max_workers, client, cache, idle_seconds, sweep_seconds):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export-prefetch")
+        self._client = client
+        self._cache = cache
+        self.idle_seconds = idle_seconds
+        self._jobs = {}  # session_id -> {(customer_id, endpoint): Future}
+        self._seen = {}  # session_id -> monotonic time it last looked at its jobs
+        self._lock = threading.Lock()
+        threading.Thread(
+            target=self._sweep_every, args=(sweep_seconds,), name="export-prefetch-sweep", daemon=True,
+        ).start()
+
+    def submit(self, session_id, customer_id, endpoints):
+        for endpoint in endpoints:
+            self.forget(session_id, customer_id, endpoint)
+        jobs = {
+            (customer_id, endpoint): self._pool.submit(
+                download_to_file, endpoint, {"customer_id": customer_id},
+                client=self._client, cache=self._cache,
+            )
+            for endpoint in endpoints
+        }
+        with self._lock:
+            self._jobs.setdefault(session_id, {}).update(jobs)
+            self._seen[session_id] = time.monotonic()
+
+    def touch(self, session_id):
+        """The session is still around: keep its jobs."""
+        with self._lock:
+            if session_id in self._jobs:
+                self._seen[session_id] = time.monotonic()
+
+    def get(self, session_id, customer_id, endpoint):
+        with self._lock:
+            if session_id in self._jobs:
+                self._seen[session_id] = time.monotonic()
+            return self._jobs.get(session_id, {}).get((customer_id, endpoint))
+
+    def take(self, session_id, customer_id, endpoint):
+        """Hand a job over to the session; it is no longer swept here."""
+        with self._lock:
+            return self._jobs.get(session_id, {}).pop((customer_id, endpoint), None)
+
+    def forget(self, session_id, customer_id, endpoint):
+        future = self.take(session_id, customer_id, endpoint)
+        if future is not None:
+            self._release(future)
+
+    def discard(self, session_id):
+        with self._lock:
+            jobs = self._jobs.pop(session_id, {})
+            self._seen.pop(session_id, None)
+        for future in jobs.values():
+            self._release(future)
+
+    def sweep(self):
+        """Discard the jobs of sessions idle for longer than `idle_seconds`."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [sid for sid, seen in self._seen.items() if now - seen > self.idle_seconds]
+        for session_id in idle:
+            self.discard(session_id)
+
+    def _sweep_every(self, seconds):
+        while True:
+            time.sleep(seconds)
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Export prefetch sweep failed")
+
+    @staticmethod
+    def _release(future):
+        if future.cancel():
+            return
+        # Still running or already done: close the temp file once there is one.
+        future.add_done_callback(lambda f: None if f.exception() else f.result().close())
+
+
+@st.cache_resource
+def get_export_prefetcher():
+    return ExportPrefetcher(
+        PREFETCH_WORKERS, get_api_client(), get_artifact_cache(),
+        PREFETCH_IDLE_SECONDS, PREFETCH_SWEEP_SECONDS,
+    )
+
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
+
+
+def _prefetch_waiting(endpoint, what):
+    job = get_export_prefetcher().get(_session_id(), st.session_state["customer_id"], endpoint)
+    if job is None or job.done():
+        st.rerun()
+    st.info(f"⏳ Preparing {what} in the background...")
+
+
+def prefetched_export(endpoint, what, file_name, key):
+    """Show a background-prepared export, if there is one.
+
+    Returns True when the quick action was handled here (in progress or ready
+    to download); False means there is no usable prefetch and the regular
+    prepare button should be shown.
+    """
+    session_id = _session_id()
+    customer_id = st.session_state["customer_id"]
+    ready = st.session_state["prefetched_exports"]
+    export = ready.get((customer_id, endpoint))
+    if export is None:
+        prefetcher = get_export_prefetcher()
+        job = prefetcher.get(session_id, customer_id, endpoint)
+        if job is None:
+            return False
+        if not job.done():
+            st.fragment(_prefetch_waiting, run_every=2)(endpoint, what)
+            return True
+        prefetcher.take(session_id, customer_id, endpoint)
+        try:
+            export = job.result()
+        except Exception as e:
+            logger.error(f"Background {endpoint} failed for customer_id={customer_id}: {e}")
+            return False
+        # The session owns the file now; it is closed with the session's state.
+        ready[(customer_id, endpoint)] = export
+
+    st.success(f"✅ {what.capitalize()} ready to download.")
+    st.download_button(
+        label="Click to download",
+        data=file_download_data(export),
+        file_name=file_name,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        key=key
+    )
+    return True
+
 
 def quick_action_usage_tracking():
     """Quick Action: prepare usage tracking and show download button."""
@@ -180,26 +1339,26 @@ def quick_action_usage_tracking():
         if st.session_state.get("customer_name")
         else "Prepare Usage Tracking"
     )
+    file_name = (
+        f"{st.session_state['customer_name'] or 'customer'}_"
+        f"{st.session_state['customer_id']}_Qpilot Usage tracking.xlsx"
+    )
+
+    if prefetched_export("download_usage_tracking", "usage tracking", file_name, key="qa_usage_download"):
+        return
 
     if st.button(label, key="qa_usage_prepare"):
         with st.spinner("Preparing usage tracking Excel..."):
-            url = f"{API_BASE}/api/download_usage_tracking"
             try:
-                resp = requests.get(
-                    url,
-                    headers=HEADERS,
+                export = stream_download(
+                    "download_usage_tracking",
                     params={"customer_id": st.session_state["customer_id"]},
-                    timeout=120
                 )
-                resp.raise_for_status()
 
                 st.download_button(
                     label="Click to download",
-                    data=resp.content,
-                    file_name=(
-                        f"{st.session_state['customer_name'] or 'customer'}_"
-                        f"{st.session_state['customer_id']}_Qpilot Usage tracking.xlsx"
-                    ),
+                    data=file_download_data(export),
+                    file_name=file_name,
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     key="qa_usage_download"
                 )
@@ -216,23 +1375,23 @@ def quick_action_product_offerings():
         if st.session_state.get("customer_name")
         else "Prepare Product Offerings"
     )
+    file_name = f"{st.session_state['customer_name'] or 'customer'}_product_offerings.xlsx"
+
+    if prefetched_export("download_products_excel", "product offerings", file_name, key="qa_offerings_download"):
+        return
 
     if st.button(label, key="qa_offerings_prepare"):
         with st.spinner("Preparing product offerings Excel..."):
-            url = f"{API_BASE}/api/download_products_excel"
             try:
-                resp = requests.get(
-                    url,
-                    headers=HEADERS,
+                export = stream_download(
+                    "download_products_excel",
                     params={"customer_id": st.session_state["customer_id"]},
-                    timeout=60
                 )
-                resp.raise_for_status()
 
                 st.download_button(
                     label="Click to download",
-                    data=resp.content,
-                    file_name=f"{st.session_state['customer_name'] or 'customer'}_product_offerings.xlsx",
+                    data=file_download_data(export),
+                    file_name=file_name,
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     key="qa_offerings_download"
                 )
@@ -242,7 +1401,270 @@ def quick_action_product_offerings():
                 logger.error(f"Download failed: {e}")
 
 
+def load_customer_bootstrap(customer_id, timings=None, client=None, cache=None, pool=None):
+    """validate_path + accountnames for a customer, shared across sessions.
+
+    Both calls only need the customer_id, so they are issued concurrently on
+    the I/O pool; this waits for them, so it must not itself run on that
+    pool. Returns ``(bootstrap, error message)`` and makes no Streamlit
+    calls. Only complete answers are cached, so a failed connect is retried
+    for real on the next attempt. Per-call wall times are written into
+    `timings`. Off the script thread, pass the shared `client`, bootstrap
+    `cache` and I/O `pool` in.
+    """
+    timings = {} if timings is None else timings
+    client = client or get_api_client()
+    cache = cache or get_bootstrap_cache()
+    pool = pool or get_io_pool()
+    cached = cache.get(customer_id)
+    if cached is not None:
+        timings["bootstrap (cached)"] = 0.0
+        return cached, None
+
+    # 1) Validate path & get ds_root + customer_name
+    validate_job = pool.submit(
+        timed_api_call, "post", "validate_path", client=client, data={"customer_id": customer_id},
+    )
+    # 2) Fetch accounts
+    accounts_job = pool.submit(
+        timed_api_call, "post", "accountnames", client=client, data={"customer_id": customer_id},
+    )
+    validate_resp, validate_error, timings["validate_path"] = validate_job.result()
+    account_response, _, timings["accountnames"] = accounts_job.result()
+
+    if not validate_resp:
+        return None, validate_error
+    if not account_response or not account_response.get("accounts"):
+        logger.warning(f"No accounts found for customer_id={customer_id}")
+        return None, "No accounts found for this customer ID or failed to fetch them."
+
+    bootstrap = {
+        "ds_root": validate_resp.get("ds_root", ""),
+        "customer_name": validate_resp.get("customer_name", ""),
+        "accounts": tuple(account_response["accounts"]),
+    }
+    cache.set(customer_id, bootstrap)
+    return bootstrap, None
+
+
+def fetch_customer_bootstrap(customer_id, timings=None):
+    """load_customer_bootstrap, reporting a failure in the page."""
+    bootstrap, error = load_customer_bootstrap(customer_id, timings)
+    if error:
+        st.error(error)
+    return bootstrap
+
+
+def _format_timings(timings):
+    return " · ".join(f"{name} {secs * 1000:.0f} ms" for name, secs in timings.items())
+
+
+# --- Excel ingestion ---
+class ExcelIngestError(ValueError):
+    """An upload failed the header check (`missing` lists the absent columns)
+    or has more than the allowed number of rows."""
+
+    def __init__(self, message, missing=()):
+        super().__init__(message)
+        self.missing = list(missing)
+
+
+def read_excel_columns(source, columns, max_rows=EXCEL_MAX_ROWS):
+    """Read just `columns` from the first sheet of an .xlsx upload.
+
+    The header row is checked before any data is parsed, rows are streamed in
+    openpyxl's read-only mode, and only the requested cells are kept, instead
+    of materialising every cell of every sheet like ``pd.read_excel``. Header
+    names are matched stripped and lower-cased; fully blank rows are skipped.
+    Returns a DataFrame with `columns` in the given order, indexed by the
+    worksheet row number so problems can be reported against the sheet.
+    """
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        first = next(ws.iter_rows(max_row=1, values_only=True), ())
+        header = [str(c).strip().lower() if c is not None else "" for c in first]
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ExcelIngestError(f"Missing column(s): {', '.join(missing)}", missing)
+        positions = [header.index(c) for c in columns]
+
+        data = {c: [] for c in columns}
+        sheet_rows = []
+        # Cells right of the last needed column are never turned into values.
+        cells = ws.iter_rows(min_row=2, max_col=max(positions) + 1, values_only=True)
+        for sheet_row, row in enumerate(cells, start=2):
+            values = [row[i] if i < len(row) else None for i in positions]
+            if all(v is None for v in values):
+                continue
+            if len(sheet_rows) >= max_rows:
+                raise ExcelIngestError(f"The file has more than {max_rows:,} rows.")
+            sheet_rows.append(sheet_row)
+            for c, v in zip(columns, values):
+                data[c].append(v)
+    finally:
+        wb.close()
+    return pd.DataFrame(data, columns=list(columns), index=pd.Index(sheet_rows, name="row"))
+
+
+# --- Pre-submit validation ---
+# Initiative names per (customer_id, account), from ranks_table, so uploads can
+# be checked against them without a round trip per submit.
+INITIATIVES_CACHE_TTL = int(os.getenv("INITIATIVES_CACHE_TTL", "600"))
+
+
+@st.cache_resource
+def get_initiatives_cache():
+    return TTLCache(256, INITIATIVES_CACHE_TTL)
+
+
+def remember_initiatives(customer_id, account, rows):
+    names = frozenset(
+        str(r.get("initiativename")).strip() for r in rows if r.get("initiativename") is not None
+    )
+    get_initiatives_cache().set((customer_id, account), names)
+    return names
+
+
+def known_initiatives(customer_id, account):
+    """The account's initiative names, or None when they can't be fetched
+    (the server still validates, so the membership check is just skipped)."""
+    names = get_initiatives_cache().get((customer_id, account))
+    if names is not None:
+        return names
+    resp, _ = call_api("get", "ranks_table", params={"customer_id": customer_id, "account": account})
+    if not resp or resp.get("rows") is None:
+        return None
+    return remember_initiatives(customer_id, account, resp["rows"])
+
+
+def validate_initiative_rows(df, known=None, require_rank=True, row_numbers=None):
+    """Vectorised checks run before rank/recommendation rows are sent.
+
+    Flags blank and duplicated initiative names, names missing from `known`
+    (when given) and, if the frame has a ``rank`` column, ranks that are
+    missing (when `require_rank`), not numbers, not whole or below 1.
+    Returns a report with one row per problem; empty means valid. Rows are
+    numbered from 1 unless `row_numbers` (e.g. worksheet rows) is given.
+    """
+    import numpy as np
+    import pandas as pd
+
+    names = df["initiativename"].astype("string").str.strip()
+    blank = names.isna() | (names == "")
+    checks = [
+        (blank, "Initiative name is missing"),
+        (~blank & names.duplicated(keep=False), "Initiative appears more than once"),
+    ]
+    if known is not None:
+        # Object-dtype isin hashes far faster than the string extension dtype.
+        known_arr = np.fromiter(known, dtype=object, count=len(known))
+        checks.append((~blank & ~names.astype(object).isin(known_arr), "Unknown initiative for this account"))
+    if "rank" in df.columns:
+        raw = df["rank"]
+        missing = raw.isna()
+        ranks = pd.to_numeric(raw, errors="coerce")
+        if require_rank:
+            checks.append((missing, "Rank is missing"))
+        checks += [
+            (~missing & ranks.isna(), "Rank must be a number"),
+            (ranks.notna() & (ranks % 1 != 0), "Rank must be a whole number"),
+            (ranks.notna() & (ranks < 1), "Rank must be 1 or higher"),
+        ]
+
+    row_numbers = np.arange(1, len(df) + 1) if row_numbers is None else np.asarray(row_numbers)
+    parts = []
+    for mask, problem in checks:
+        hits = np.flatnonzero(mask.fillna(False).to_numpy(dtype=bool))
+        if len(hits):
+            parts.append(pd.DataFrame({
+                "Row": row_numbers[hits],
+                "Initiative": names.iloc[hits].fillna("").to_numpy(),
+                "Problem": problem,
+            }))
+    if not parts:
+        return pd.DataFrame(columns=["Row", "Initiative", "Problem"])
+    return pd.concat(parts, ignore_index=True).sort_values("Row", kind="stable", ignore_index=True)
+
+
+def changed_rank_rows(original_rows, edited):
+    """Rows of the `edited` frame whose rank differs from `original_rows`.
+
+    Matched on initiative name; a rank cleared or set for the first time
+    counts as a change. Returns records ready to send as a patch.
+    """
+    import pandas as pd
+
+    before = (
+        pd.DataFrame(original_rows, columns=["initiativename", "rank"])
+        .drop_duplicates("initiativename")
+        .set_index("initiativename")["rank"]
+    )
+    old = pd.to_numeric(edited["initiativename"].map(before), errors="coerce")
+    new = pd.to_numeric(edited["rank"], errors="coerce")
+    changed = ~((old == new) | (old.isna() & new.isna()))
+    return edited.loc[changed].to_dict("records")
+
+
+def fetch_ranks_page(customer_id, account, offset=0, search="", all_rows=None):
+    """One page of an account's initiatives: ``(page, error message)``.
+
+    Asks ranks_table for RANKS_PAGE_SIZE rows from `offset` whose name
+    contains `search`. A server that does not page sends every row instead;
+    the page then keeps them as ``all_rows`` so that later pages (passed
+    back in as `all_rows`) are cut from them without another fetch. Makes
+    no Streamlit calls.
+    """
+    if all_rows is None:
+        params = {"customer_id": customer_id, "account": account, "offset": offset, "limit": RANKS_PAGE_SIZE}
+        if search:
+            params["search"] = search
+        resp, error = call_api("get", "ranks_table", params=params)
+        if not resp or resp.get("rows") is None:
+            return None, error or "Failed to load initiatives for this account."
+        if "total" in resp:
+            return {
+                "offset": offset, "search": search, "total": resp["total"],
+                "rows": resp["rows"], "all_rows": None,
+            }, None
+        all_rows = resp["rows"]
+        remember_initiatives(customer_id, account, all_rows)
+
+    rows = all_rows
+    if search:
+        needle = search.lower()
+        rows = [r for r in all_rows if needle in str(r.get("initiativename") or "").lower()]
+    return {
+        "offset": offset, "search": search, "total": len(rows),
+        "rows": rows[offset:offset + RANKS_PAGE_SIZE], "all_rows": all_rows,
+    }, None
+
+
+def merge_rank_edits(changes, page_rows, edited):
+    """Fold one page of the editor into the change set ({initiativename: rank}).
+
+    Only ranks that differ from what the server sent are kept, so a rank
+    edited back to its original value drops out again.
+    """
+    import pandas as pd
+
+    for row in page_rows:
+        changes.pop(row.get("initiativename"), None)
+    for row in changed_rank_rows(page_rows, edited):
+        changes[row["initiativename"]] = None if pd.isna(row["rank"]) else row["rank"]
+    return changes
+
+
+def show_validation_report(report):
+    st.error(f"Found {len(report)} problem(s); nothing was sent. Fix them and submit again.")
+    st.dataframe(report, width="stretch", hide_index=True)
+
+
 # --- Tabs ---
+@timed_render()
 def initial_setup_tab():
     st.header("Initial Setup")
 
@@ -253,6 +1675,15 @@ def initial_setup_tab():
             value=st.session_state.get('customer_id', ''),
             help="Unique identifier for the customer."
         )
+        refresh = st.checkbox(
+            "Reload customer data from the server",
+            help="Skip the shared cache, e.g. after accounts were added for this customer."
+        )
+        prefetch = st.checkbox(
+            "Prepare quick-action downloads in the background",
+            value=PREFETCH_EXPORTS,
+            help="Starts the usage tracking and product offerings exports as soon as you connect."
+        )
         connect = st.form_submit_button("Connect to Repo")
 
     if connect:
@@ -260,33 +1691,38 @@ def initial_setup_tab():
             st.error("Please enter a Customer ID.")
             return
 
+        if refresh:
+            get_bootstrap_cache().invalidate(customer_id)
         with st.spinner("Validating path and fetching customer data..."):
-            # 1) Validate path & get ds_root + customer_name
-            validate_resp = make_api_request("post", "validate_path", data={"customer_id": customer_id})
-            if not validate_resp:
+            started = time.perf_counter()
+            timings = {}
+            # batch_types only needs the customer_id too; loading it alongside
+            # the bootstrap saves get_batch_types a round trip after the rerun.
+            types_timings = {}
+            types_job = get_io_pool().submit(get_batch_types_cache().get, customer_id, types_timings)
+            bootstrap = fetch_customer_bootstrap(customer_id, timings)
+            types_job.result()
+            timings.update(types_timings)
+            timings["total"] = time.perf_counter() - started
+            logger.info(f"Connect timings for customer_id={customer_id}: {_format_timings(timings)}")
+            if not bootstrap:
                 return
 
-            ds_root = validate_resp.get("ds_root", "")
-            customer_name = validate_resp.get("customer_name", "")
-
-            # 2) Fetch accounts
-            account_response = make_api_request("post", "accountnames", data={"customer_id": customer_id})
-            if not account_response or not account_response.get("accounts"):
-                st.error("No accounts found for this customer ID or failed to fetch them.")
-                logger.warning(f"No accounts found for customer_id={customer_id}")
-                return
-
-            account_names = account_response["accounts"]
-            selected_account = account_names[0]
+            ds_root = bootstrap["ds_root"]
+            customer_name = bootstrap["customer_name"]
+            account_names = list(bootstrap["accounts"])
 
         # Persist state and move on
-        st.session_state['ds_root'] = ds_root
-        st.session_state['customer_id'] = customer_id
-        st.session_state['customer_name'] = customer_name
-        st.session_state['account_names'] = account_names
-        for k in ("contact_account", "ranks_account", "rec_account"):
-            st.session_state[k] = account_names[0] if account_names else None
-        st.session_state['setup_complete'] = True
+        st.session_state["workspace"][customer_id] = new_workspace_entry(
+            ds_root, customer_name, account_names, timings,
+        )
+        activate_customer(customer_id)
+        if prefetch:
+            for endpoint in QUICK_ACTION_EXPORTS:
+                stale = st.session_state["prefetched_exports"].pop((customer_id, endpoint), None)
+                if stale is not None:
+                    stale.close()
+            get_export_prefetcher().submit(_session_id(), customer_id, QUICK_ACTION_EXPORTS)
         st.success("Connected successfully.")
         st.rerun()
 
@@ -296,6 +1732,8 @@ def initial_setup_tab():
         st.divider()
         st.markdown("#### Quick actions")
         st.caption("Use these shortcuts to avoid switching tabs for quick downloads.")
+        if st.session_state.get("connect_timings"):
+            st.caption(f"Last connect: {_format_timings(st.session_state['connect_timings'])}")
 
         # Optional: show in a bordered container if your Streamlit version supports it
         with st.container():
@@ -303,6 +1741,7 @@ def initial_setup_tab():
             quick_action_usage_tracking()
             quick_action_product_offerings()
 
+@timed_render()
 def usage_tracking_tab():
     st.header("Usage Tracking")
     disabled = not st.session_state.setup_complete
@@ -318,18 +1757,14 @@ def usage_tracking_tab():
 
     if st.button(label):
         with st.spinner("Preparing usage tracking Excel..."):
-            url = f"{API_BASE}/api/download_usage_tracking"
             try:
-                resp = requests.get(
-                    url,
-                    headers=HEADERS,
+                export = stream_download(
+                    "download_usage_tracking",
                     params={"customer_id": st.session_state['customer_id']},
-                    timeout=120
                 )
-                resp.raise_for_status()
                 st.download_button(
                     label="Click to download",
-                    data=resp.content,
+                    data=file_download_data(export),
                     file_name=f"{st.session_state['customer_name'] or 'customer'}_{st.session_state['customer_id']}_Qpilot Usage tracking.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
@@ -338,9 +1773,107 @@ def usage_tracking_tab():
                 st.error(f"Failed to download usage tracking: {e}")
                 logger.error(f"Usage tracking download failed: {e}")
 
-import time
+# Config generation is polled from a self-refreshing fragment instead of a
+# blocking loop. Polling is fast while the script starts up and backs off the
+# longer it runs: (elapsed seconds up to, poll interval); the last entry
+# applies after that.
+_CONFIG_POLL_BACKOFF = ((30, 2), (120, 5), (None, 10))
+_CONFIG_TIMEOUT = 7 * 60
+
+
+def _config_poll_interval(elapsed):
+    for until, interval in _CONFIG_POLL_BACKOFF:
+        if until is None or elapsed < until:
+            return interval
+
+
+def _pretty_config_status(raw_status):
+    # Friendly copy (same vibes as your sample)
+    if raw_status.lower().startswith("starting"):
+        return "Content loaded from DB. Generation has started."
+    if raw_status.lower().startswith("generating"):
+        return "Generating config & JD…"
+    if raw_status.lower().startswith("completed"):
+        return "Completed"
+    if raw_status.lower().startswith("error"):
+        return "Error occurred"
+    return raw_status or "Unknown"
+
+
+def _config_monitor(customer_id, interval):
+    """One customer's config generation; reruns on its own every `interval`s."""
+    mon = st.session_state["rc_monitors"].get(customer_id)
+    if mon is None:
+        return
+
+    now = time.time()
+    if mon["state"] == "running":
+        if now - mon["started"] >= _CONFIG_TIMEOUT:
+            mon["state"] = "timeout"
+        # Full-app reruns also execute the fragment; only poll when it's due.
+        elif now - mon.get("polled_at", 0) >= interval - 0.5:
+            mon["polled_at"] = now
+            status_resp = make_api_request(
+                "get",
+                "config_status",
+                params={"customer_id": customer_id}
+            )
+            mon["unreachable"] = not status_resp
+            if status_resp:
+                mon["progress"] = float(status_resp.get("progress", 0.0))
+                mon["status"] = (status_resp.get("status") or "").strip()
+                if mon["status"].lower().startswith("completed"):
+                    mon["state"] = "completed"
+                elif mon["status"].lower().startswith("error"):
+                    mon["state"] = "error"
+
+    st.markdown(f"**{mon.get('customer_name') or customer_id}**")
+    st.progress(max(0.0, min(1.0, mon.get("progress", 0.0))))
+    if mon["state"] == "running":
+        if mon.get("unreachable"):
+            st.warning("Unable to fetch progress.")
+        else:
+            st.write(f"Status: **{_pretty_config_status(mon.get('status', ''))}**")
+    elif mon["state"] == "completed":
+        st.success("Configuration completed successfully.")
+    elif mon["state"] == "error":
+        st.error("An error occurred. Check server logs for details.")
+    else:
+        st.warning("Config generation timed out after 7 minutes. It may still complete in the background.")
+
+    if mon["state"] != "running":
+        if st.button("Dismiss", key=f"rc_dismiss_{customer_id}"):
+            st.session_state["rc_monitors"].pop(customer_id, None)
+            st.rerun()
+        if interval is not None:
+            st.rerun()  # re-register without run_every so polling stops
+    elif _config_poll_interval(now - mon["started"]) != interval:
+        st.rerun()  # next backoff step: re-register with the longer interval
+
+
+def config_monitors():
+    """Render every config generation this session is monitoring.
+
+    Drawn in the sidebar so monitoring survives section switches, and one
+    fragment per customer so several refreshes can be followed at once.
+    """
+    monitors = st.session_state.get("rc_monitors") or {}
+    if not monitors:
+        return
+    st.markdown("### Config generation")
+    for customer_id, mon in list(monitors.items()):
+        interval = (
+            _config_poll_interval(time.time() - mon["started"])
+            if mon["state"] == "running" else None
+        )
+        # Each monitor gets its own container so the fragments get distinct ids.
+        with st.container():
+            st.fragment(_config_monitor, run_every=interval)(customer_id, interval)
+
+
+@timed_render()
 def refresh_config_tab():
-    """Re-run config generation and live-monitor status (auto-polls for ~7 minutes)."""
+    """Re-run config generation; progress is monitored from the sidebar."""
     st.header("Refresh Config")
     disabled = not st.session_state.setup_complete
 
@@ -350,67 +1883,110 @@ def refresh_config_tab():
 
     st.write("Click the button below to update config files with the latest product offerings.")
 
-    if st.button("Re-run Config Generation", disabled=disabled):
+    customer_id = st.session_state['customer_id']
+    running = (st.session_state["rc_monitors"].get(customer_id) or {}).get("state") == "running"
+    if running:
+        st.info("Config generation is running for this customer. Progress is shown in the sidebar.")
+
+    if st.button("Re-run Config Generation", disabled=disabled or running):
         with st.spinner("Triggering config generation..."):
             resp = make_api_request(
                 "post",
                 "refreshconfig",
-                data={"customer_id": st.session_state['customer_id']}
+                data={"customer_id": customer_id}
             )
 
         if not resp or not resp.get("success"):
             st.error("Failed to start config generation.")
             return
 
-        st.success("Launching script and monitoring progress...")
-
-        # UI placeholders
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        st.session_state["rc_monitors"][customer_id] = {
+            "customer_name": st.session_state.get("customer_name"),
+            "started": time.time(),
+            "state": "running",
+            "progress": 0.0,
+            "status": "",
+        }
+        st.rerun()
 
-        # Poll every 2s for up to 7 minutes
-        start = time.time()
-        timeout = 7 * 60
-        while time.time() - start < timeout:
-            time.sleep(2)
-            status_resp = make_api_request(
-                "get",
-                "config_status",
-                params={"customer_id": st.session_state['customer_id']}
-            )
 
-            if not status_resp:
-                status_text.warning("Unable to fetch progress.")
-                continue
+def upload_contacts_chunked(f, size, customer_id, account, state, on_progress=None):
+    """Upload a contacts CSV in gzip-compressed chunks, resumably.
 
-            progress = float(status_resp.get("progress", 0.0))
-            raw_status = (status_resp.get("status") or "").strip()
-
-            # Friendly copy (same vibes as your sample)
-            if raw_status.lower().startswith("starting"):
-                pretty = "Content loaded from DB. Generation has started."
-            elif raw_status.lower().startswith("generating"):
-                pretty = "Generating config & JD…"
-            elif raw_status.lower().startswith("completed"):
-                pretty = "Completed"
-            elif raw_status.lower().startswith("error"):
-                pretty = "Error occurred"
-            else:
-                pretty = raw_status or "Unknown"
+    Protocol: ``upload_contacts_start`` returns an ``upload_id`` (and the
+    offset already received); each ``upload_contacts_chunk`` carries the
+    byte offset of its uncompressed slice and returns the new offset;
+    ``upload_contacts_status`` reports the server's offset so a retry -- in
+    this call or in a later one holding the same `state` -- continues from
+    there; ``upload_contacts_finish`` imports the file and answers like
+    ``upload_contacts``.
 
-            progress_bar.progress(max(0.0, min(1.0, progress)))
-            status_text.write(f"Status: **{pretty}**")
-
-            if raw_status.lower().startswith("completed"):
-                st.success("Configuration completed successfully.")
-                break
-            if raw_status.lower().startswith("error"):
-                st.error("An error occurred. Check server logs for details.")
-                break
+    Only one chunk is held at a time. `state` is a dict the caller keeps
+    between attempts (it stores the upload_id). A chunk that fails, or that
+    the server answers without moving its offset forward, is retried after
+    CONTACTS_RETRY_DELAY, doubled every time; RequestException is raised once
+    it has failed more than CONTACTS_CHUNK_RETRIES times in a row.
+    """
+    client = get_api_client()
+    offset = None
+    if state.get("upload_id"):
+        resp = client.request("get", "upload_contacts_status", params={"upload_id": state["upload_id"]})
+        if resp.ok:
+            offset = int(resp.json().get("offset", 0))
         else:
-            st.warning("Config generation timed out after 7 minutes. It may still complete in the background.")
+            state.clear()  # the server no longer knows this upload; start over
+    if offset is None:
+        resp = client.request(
+            "post", "upload_contacts_start",
+            data={"customer_id": customer_id, "account": account, "filename": f"{account}.csv", "size": size},
+        )
+        resp.raise_for_status()
+        started = resp.json()
+        state["upload_id"] = started["upload_id"]
+        offset = int(started.get("offset", 0))
+
+    failures = 0
+    while offset < size:
+        f.seek(offset)
+        body = gzip.compress(f.read(CONTACTS_CHUNK_BYTES), compresslevel=6)
+        try:
+            resp = client.request(
+                "post", "upload_contacts_chunk",
+                params={"upload_id": state["upload_id"], "offset": offset},
+                data=body,
+                headers={"Content-Encoding": "gzip", "Content-Type": "application/octet-stream"},
+            )
+            resp.raise_for_status()
+            new_offset = int(resp.json()["offset"])
+            if new_offset <= offset:
+                raise requests.exceptions.RequestException(
+                    f"Server did not take the chunk (offset stayed at {new_offset})"
+                )
+            offset = new_offset
+            failures = 0
+        except requests.exceptions.RequestException as e:
+            failures += 1
+            logger.warning(f"Contacts chunk at offset {offset} failed ({failures}): {e}")
+            if failures > CONTACTS_CHUNK_RETRIES:
+                raise
+            time.sleep(CONTACTS_RETRY_DELAY * 2 ** (failures - 1))
+            # The chunk may have landed before the failure; ask where to resume.
+            try:
+                status = client.request("get", "upload_contacts_status", params={"upload_id": state["upload_id"]})
+                if status.ok:
+                    offset = int(status.json().get("offset", offset))
+            except (requests.exceptions.RequestException, ValueError) as status_error:
+                logger.warning(f"Contacts upload status failed, retrying at offset {offset}: {status_error}")
+        if on_progress:
+            on_progress(offset, size)
+
+    resp = client.request("post", "upload_contacts_finish", data={"upload_id": state["upload_id"]})
+    resp.raise_for_status()
+    state.clear()
+    return resp.json()
 
 
+@timed_render()
 def contacts_tab():
     st.header("Manage Contacts")
     disabled = not st.session_state.setup_complete
@@ -441,10 +2017,29 @@ def contacts_tab():
     submit_disabled = contact_file is None
     if st.button("Submit New Contacts", disabled=submit_disabled):
         try:
-            files = {"file": (f"{account}.csv", contact_file.getvalue())}
-            data = {"account": account, "customer_id": st.session_state["customer_id"]}
-            with st.spinner("Uploading contacts..."):
-                response = make_api_request("post", "upload_contacts", files=files, data=data)
+            if contact_file.size >= CONTACTS_CHUNKED_MIN_BYTES:
+                # Keyed by the uploaded file, so clicking Submit again after a
+                # failure resumes instead of starting over.
+                resume = st.session_state["contact_upload_resume"]
+                state = resume.setdefault(contact_file.file_id, {})
+                bar = st.progress(0.0, text="Uploading contacts...")
+                try:
+                    response = upload_contacts_chunked(
+                        contact_file, contact_file.size, st.session_state["customer_id"], account, state,
+                        on_progress=lambda done, total: bar.progress(
+                            min(done / total, 1.0), text=f"Uploading contacts... {done * 100 // total}%"
+                        ),
+                    )
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Chunked contacts upload failed: {e}")
+                    st.error(f"Upload interrupted: {e}. Click Submit again to resume where it stopped.")
+                    return
+                resume.pop(contact_file.file_id, None)
+            else:
+                files = {"file": (f"{account}.csv", contact_file.getvalue())}
+                data = {"account": account, "customer_id": st.session_state["customer_id"]}
+                with st.spinner("Uploading contacts..."):
+                    response = make_api_request("post", "upload_contacts", files=files, data=data)
 
             if response:
                 # Persist a one-shot success message and the payload
@@ -458,32 +2053,77 @@ def contacts_tab():
         except Exception as e:
             st.error(f"Unexpected error during upload: {e}")
 
+
+def full_rank_rows(customer_id, account):
+    """Every initiative of the account with the change set applied.
+
+    Returns ``(rows, None)``, or ``(None, report)`` when the merged table
+    fails validation (the error is shown when it could not be fetched).
+    """
+    import pandas as pd
+
+    resp = make_api_request("get", "ranks_table", params={"customer_id": customer_id, "account": account})
+    if not resp or resp.get("rows") is None:
+        return None, None
+    changes = st.session_state.get("ranks_changes") or {}
+    rows = [
+        {**r, "rank": changes[r.get("initiativename")]} if r.get("initiativename") in changes else r
+        for r in resp["rows"]
+    ]
+    report = validate_initiative_rows(pd.DataFrame(rows))
+    if not report.empty:
+        return None, report
+    return rows, None
+
+
+def _set_ranks_page(page):
+    """Show `page` in the manual editor (None: nothing loaded).
+
+    The editor and search keys carry ranks_editor_version, so bumping it
+    remounts them: edits the old editor holds by row position are dropped
+    instead of landing on the new page's rows.
+    """
+    st.session_state["ranks_page"] = page
+    st.session_state["ranks_editor_version"] = st.session_state.get("ranks_editor_version", 0) + 1
+
+
 @st.dialog("Confirm rank update")
 def confirm_ranks_dialog(account: str):
     st.warning(f"Are you sure you want to update ranks for **{account}** initiatives?")
-    st.caption("This will overwrite ranks for this account for the current customer.")
+    patch_rows = st.session_state.get("ranks_patch_rows")
+    if patch_rows is None:
+        st.caption("This will overwrite ranks for this account for the current customer.")
+    else:
+        st.caption(
+            f"This will update the {len(patch_rows)} changed rank(s) for this account "
+            "for the current customer; other ranks are left as they are."
+        )
 
     c1, c2 = st.columns(2)
 
     if c1.button("Yes, update ranks", key=f"dialog_yes_update_{account}"):
-        rows = st.session_state.get("draft_rows", [])
-
-        # Validate ranks
-        for r in rows:
-            if r.get("rank") is None:
-                st.error("All rows must have a rank.")
-                return
-            try:
-                r["rank"] = int(r["rank"])
-            except Exception:
-                st.error("Ranks must be integers.")
+        if patch_rows is None:
+            # Full replace: merge the change set into every row only now, so
+            # the whole table is never kept in session state.
+            with st.spinner("Loading all initiatives..."):
+                rows, report = full_rank_rows(st.session_state["customer_id"], account)
+            if rows is None:
+                st.session_state["confirm_ranks_pending"] = False
+                if report is not None:
+                    show_validation_report(report)
                 return
+        else:
+            rows = patch_rows
+        # Rows were validated by now; ranks are whole numbers.
+        rows = [{**r, "rank": int(r["rank"])} for r in rows]
 
         payload = {
             "customer_id": st.session_state["customer_id"],
             "account": account,
             "rows": rows
         }
+        if patch_rows is not None:
+            payload["mode"] = "patch"
 
         with st.spinner("Updating ranks..."):
             resp = make_api_request("post", "update_ranks", json=payload)
@@ -492,8 +2132,9 @@ def confirm_ranks_dialog(account: str):
             st.session_state["ranks_notice"] = (
                 f"Ranks updated for {account} (periodid={resp.get('periodid')})."
             )
-            st.session_state["manual_rows"] = []
-            st.session_state["draft_rows"] = []
+            _set_ranks_page(None)
+            st.session_state["ranks_changes"] = {}
+            st.session_state["ranks_patch_rows"] = None
             st.session_state["confirm_ranks_pending"] = False
             st.rerun()
         else:
@@ -506,6 +2147,7 @@ def confirm_ranks_dialog(account: str):
         st.rerun()
 
 
+@timed_render()
 def ranks_tab():
     """Update initiative ranks via Excel upload or manual entry."""
     st.header("Update Ranks")
@@ -524,9 +2166,9 @@ def ranks_tab():
     # clear loaded initiatives + confirm state when account changes
     if st.session_state.get("_prev_ranks_account") != account:
         st.session_state["_prev_ranks_account"] = account
-        st.session_state["manual_rows"] = []
+        _set_ranks_page(None)
+        st.session_state["ranks_changes"] = {}
         st.session_state["confirm_ranks_pending"] = False
-        st.session_state["draft_rows"] = []
 
     # ✅ Manual first
     mode = st.radio(
@@ -546,22 +2188,28 @@ def ranks_tab():
         if st.button("Submit Ranks from Excel", disabled=submit_disabled):
             import pandas as pd
             try:
-                df = pd.read_excel(excel_file)
+                df = read_excel_columns(excel_file, ("initiativename", "rank"))
+            except ExcelIngestError as e:
+                if e.missing:
+                    st.error("The uploaded Excel must have columns: initiativename, rank")
+                else:
+                    st.error(f"Could not read Excel: {e}")
+                return
             except Exception as e:
                 st.error(f"Could not read Excel: {e}")
                 return
 
-            required = {"initiativename", "rank"}
-            if not required.issubset(set(df.columns.str.lower())):
-                st.error("The uploaded Excel must have columns: initiativename, rank")
-                return
-
-            df.columns = [c.lower() for c in df.columns]
-            rows = (
-                df[["initiativename", "rank"]]
-                .dropna(subset=["initiativename", "rank"])
-                .to_dict("records")
+            df = df.dropna(subset=["initiativename", "rank"])
+            report = validate_initiative_rows(
+                df,
+                known=known_initiatives(st.session_state["customer_id"], account),
+                row_numbers=df.index,
             )
+            if not report.empty:
+                show_validation_report(report)
+                return
+            df["rank"] = pd.to_numeric(df["rank"]).astype(int)
+            rows = df.to_dict("records")
             if not rows:
                 st.warning("No valid rows found.")
                 return
@@ -579,40 +2227,57 @@ def ranks_tab():
 
     else:
         st.caption("Load initiatives for the selected account, edit ranks, then save.")
+        customer_id = st.session_state["customer_id"]
 
         # Load button
         if st.button(f"Click to load {account} initiatives"):
             with st.spinner("Loading initiatives..."):
-                resp = make_api_request("get", "ranks_table", params={"customer_id": st.session_state["customer_id"], "account": account})
+                page, error = fetch_ranks_page(customer_id, account)
 
-            if resp and resp.get("rows") is not None:
-                st.session_state['manual_rows'] = resp["rows"]
-                st.session_state['draft_rows'] = resp["rows"]
+            if page is not None:
+                _set_ranks_page(page)
+                st.session_state['ranks_changes'] = {}
                 st.session_state['confirm_ranks_pending'] = False
-                st.success(f"Loaded {len(resp['rows'])} initiative(s).")
+                st.success(f"Loaded {page['total']} initiative(s).")
                 st.rerun()
             else:
-                st.error("Failed to load initiatives for this account.")
+                st.error(error)
 
-        if not st.session_state.get('manual_rows'):
+        page = st.session_state.get('ranks_page')
+        if not page:
             st.info("No initiatives loaded yet. Click the button above to load.")
             return
 
         import pandas as pd
 
-        if not st.session_state.get("draft_rows"):
-            st.session_state["draft_rows"] = st.session_state["manual_rows"]
-
-        df = pd.DataFrame(st.session_state["draft_rows"])
+        # Only the current page is kept; edits live in the change set
+        # ({initiativename: rank}) and are shown over the server's ranks.
+        changes = st.session_state["ranks_changes"]
+        df = pd.DataFrame(page["rows"]) if page["rows"] else pd.DataFrame(columns=["initiativename", "rank"])
 
         if "initiativename" not in df.columns:
             st.error("Loaded data missing initiativename.")
             return
         if "rank" not in df.columns:
             df["rank"] = None
+        if changes:
+            pending = df["initiativename"].isin(list(changes))
+            df.loc[pending, "rank"] = df.loc[pending, "initiativename"].map(changes)
+
+        shown = f"{page['offset'] + 1}–{page['offset'] + len(page['rows'])}" if page["rows"] else "0"
+        matching = f" matching “{page['search']}”" if page["search"] else ""
+        st.caption(
+            f"Initiatives {shown} of {page['total']}{matching} · {len(changes)} unsaved change(s)."
+        )
 
-        # ✅ FIX: editor inside form so it doesn't rerun on each edit
+        # ✅ FIX: editor inside form so it doesn't rerun on each edit. The keys
+        # change whenever the page is replaced (_set_ranks_page), so one
+        # page's edits never land on another.
+        version = st.session_state.get("ranks_editor_version", 0)
         with st.form(key=f"ranks_manual_form_{account}"):
+            search = st.text_input(
+                "Search initiatives", value=page["search"], key=f"ranks_search_{account}_{version}",
+            ).strip()
             edited = st.data_editor(
                 df,
                 width='stretch',
@@ -622,13 +2287,52 @@ def ranks_tab():
                     "initiativename": st.column_config.TextColumn("Initiative Name"),
                     "rank": st.column_config.NumberColumn("Rank", min_value=1, step=1),
                 },
-                key=f"ranks_editor_{account}",
+                key=f"ranks_editor_{account}_{version}",
+            )
+            full_replace = st.checkbox(
+                "Replace all ranks (send every row, not just the changed ones)",
+                key=f"ranks_full_replace_{account}",
             )
-            save_clicked = st.form_submit_button("Save ranking")
+            b1, b2, b3 = st.columns([1, 1, 3])
+            prev_clicked = b1.form_submit_button("◀ Previous", disabled=page["offset"] == 0)
+            next_clicked = b2.form_submit_button(
+                "Next ▶", disabled=page["offset"] + RANKS_PAGE_SIZE >= page["total"],
+            )
+            save_clicked = b3.form_submit_button("Save ranking")
+
+        # Every submit (a page move, a search or a save) first keeps this
+        # page's edits; without a submit the editor returns what it was given.
+        merge_rank_edits(changes, page["rows"], edited)
+
+        # A save wins over a search typed in the same submit; the search is
+        # left in the box to be submitted again.
+        if save_clicked and search != page["search"]:
+            st.info("The search was not applied because Save was pressed. Submit it again to search.")
+        elif search != page["search"] or prev_clicked or next_clicked:
+            offset = 0 if search != page["search"] else max(
+                0, page["offset"] + (RANKS_PAGE_SIZE if next_clicked else -RANKS_PAGE_SIZE),
+            )
+            with st.spinner("Loading initiatives..."):
+                new_page, error = fetch_ranks_page(customer_id, account, offset, search, page["all_rows"])
+            if new_page is None:
+                st.error(error)
+            else:
+                _set_ranks_page(new_page)
+                st.rerun()
 
         if save_clicked:
-            st.session_state["draft_rows"] = edited.to_dict("records")
-            st.session_state["confirm_ranks_pending"] = True
+            rows = [{"initiativename": name, "rank": rank} for name, rank in changes.items()]
+            report = validate_initiative_rows(pd.DataFrame(rows, columns=["initiativename", "rank"]))
+            if not report.empty:
+                show_validation_report(report)
+            elif full_replace:
+                st.session_state["ranks_patch_rows"] = None
+                st.session_state["confirm_ranks_pending"] = True
+            elif rows:
+                st.session_state["ranks_patch_rows"] = rows
+                st.session_state["confirm_ranks_pending"] = True
+            else:
+                st.info("No ranks were changed, so there is nothing to save.")
 
         # Modal confirmation flow
         if st.session_state.get("confirm_ranks_pending"):
@@ -637,6 +2341,7 @@ def ranks_tab():
 
 
                 
+@timed_render()
 def update_recommendation_tab():
     st.header("Update Recommendation")
     disabled = not st.session_state.setup_complete
@@ -653,16 +2358,16 @@ def update_recommendation_tab():
     st.subheader("1) Download initiatives template")
     if st.button(f"Download initiative table for {account}"):
         with st.spinner("Preparing Excel template..."):
-            url = f"{API_BASE}/api/download_recommendations_template"
             try:
-                resp = requests.get(url,headers=HEADERS,params={"customer_id": st.session_state["customer_id"], "account": account},timeout=60)
-
-                resp.raise_for_status()
+                export = stream_download(
+                    "download_recommendations_template",
+                    params={"customer_id": st.session_state["customer_id"], "account": account},
+                )
 
                 fname = f"{account}_initiatives_{st.session_state.get('customer_name','customer')}.xlsx"
                 st.download_button(
                     label="Click to download",
-                    data=resp.content,
+                    data=file_download_data(export),
                     file_name=fname,
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
@@ -681,31 +2386,37 @@ def update_recommendation_tab():
     submit_disabled = excel_file is None
     if st.button("Submit Recommendations", disabled=submit_disabled):
         import pandas as pd
-        try:
-            df = pd.read_excel(excel_file)
-        except Exception as e:
-            st.error(f"Could not read Excel: {e}")
-            return
-
-        # Normalize column names
-        df.columns = [c.strip().lower() for c in df.columns]
-
-        required = {
+        required = (
             "initiativename",
             "recommendation_withoutcollateral",
             "recommendation_withcollateral_a",
             "recommendation_withcollateral_b",
-        }
-        if not required.issubset(set(df.columns)):
-            st.error(
-                "Invalid template. Required columns: initiativename, "
-                "recommendation_withoutcollateral, recommendation_withcollateral_a, "
-                "recommendation_withcollateral_b"
-            )
+        )
+        try:
+            df = read_excel_columns(excel_file, required)
+        except ExcelIngestError as e:
+            if e.missing:
+                st.error(
+                    "Invalid template. Required columns: initiativename, "
+                    "recommendation_withoutcollateral, recommendation_withcollateral_a, "
+                    "recommendation_withcollateral_b"
+                )
+            else:
+                st.error(f"Could not read Excel: {e}")
+            return
+        except Exception as e:
+            st.error(f"Could not read Excel: {e}")
             return
 
-        clean = df[list(required)].dropna(subset=["initiativename"]).copy()
-
+        clean = df.dropna(subset=["initiativename"]).copy()
+        report = validate_initiative_rows(
+            clean,
+            known=known_initiatives(st.session_state["customer_id"], account),
+            row_numbers=clean.index,
+        )
+        if not report.empty:
+            show_validation_report(report)
+            return
 
         clean = clean.where(pd.notnull(clean), None)
 
@@ -729,6 +2440,7 @@ def update_recommendation_tab():
         else:
             st.error("Server did not confirm the update.")
 
+@timed_render()
 def offerings_tab():
     st.header("Product Offerings")
     disabled = not st.session_state.setup_complete
@@ -742,19 +2454,14 @@ def offerings_tab():
 
     if st.button(label):
         with st.spinner("Preparing download..."):
-            url = f"{API_BASE}/api/download_products_excel"
             try:
-                resp = requests.get(
-                    url,
-                    headers=HEADERS,
+                export = stream_download(
+                    "download_products_excel",
                     params={"customer_id": st.session_state["customer_id"]},
-                    timeout=60
                 )
-
-                resp.raise_for_status()
                 st.download_button(
                     label="Click to download",
-                    data=resp.content,
+                    data=file_download_data(export),
                     file_name=f"{st.session_state['customer_name'] or 'customer'}_product_offerings.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
@@ -773,55 +2480,559 @@ _BATCH_HISTORY_LABELS = {
 }
 
 
-def _build_batch_history_df(accounts_sorted, history, mode_labels=None):
-    """One row per account: its most recent run of THIS batch."""
+# Status filter value for accounts that never ran the batch.
+_NEVER_RUN = "never_run"
+_BATCH_HISTORY_FIELDS = ("status", "started_at", "finished_at", "scripts_succeeded", "scripts_total", "mode")
+_BATCH_HISTORY_WINDOWS = {"Any time": None, "Last 24 hours": 1, "Last 7 days": 7, "Last 30 days": 30}
+
+
+def _batch_history_frame(accounts, history):
+    """The raw history fields of `accounts`, one row each and in that order.
+
+    `ran` is False for accounts with no run of this batch.
+    """
+    import pandas as pd
+    history = history if isinstance(history, dict) else {}
+    # Column by column: far cheaper than letting pandas parse a dict of records.
+    records = [history.get(name) or {} for name in accounts]
+    columns = {field: [rec.get(field) for rec in records] for field in _BATCH_HISTORY_FIELDS}
+    columns["ran"] = [bool(rec) for rec in records]
+    return pd.DataFrame(columns, index=pd.Index(accounts, name="Account"))
+
+
+def _filter_batch_history(frame, view):
+    """The rows of `frame` matching the status / name prefix / last-run filters."""
+    import numpy as np
     import pandas as pd
-    rows = []
-    for name in accounts_sorted:
-        rec = history.get(name) if isinstance(history, dict) else None
-        if not rec:
-            row = {"Account": name, "Last Run": "—", "Status": "Never run", "Progress": ""}
-            if mode_labels:
-                row["Mode"] = ""
-            rows.append(row)
-            continue
+    mask = np.ones(len(frame), dtype=bool)
+    if view["statuses"]:
+        status = frame["status"].where(frame["ran"], _NEVER_RUN)
+        mask &= status.isin(view["statuses"]).to_numpy()
+    if view["prefix"]:
+        mask &= np.asarray(frame.index.str.lower().str.startswith(view["prefix"].lower()), dtype=bool)
+    if view["days"]:
+        in_progress = frame["status"].eq("in_progress")
+        raw = frame["started_at"].where(in_progress, frame["finished_at"])
+        try:
+            last_run = pd.to_datetime(raw, errors="coerce")
+        except ValueError:  # rows carry different UTC offsets
+            last_run = pd.to_datetime(raw, errors="coerce", utc=True)
+        # Naive timestamps are the server's local time, like its own
+        # last_run_days filter uses: compare them with naive now, not UTC.
+        now = pd.Timestamp.now() if last_run.dt.tz is None else pd.Timestamp.now(tz="UTC")
+        mask &= (last_run >= now - pd.Timedelta(days=view["days"])).to_numpy()
+    return frame[mask]
+
+
+def _format_batch_history(frame, mode_labels=None, queue_positions=None):
+    """Display table for a history frame: Account, Last Run, Status, Progress
+    (plus Mode with `mode_labels`, and with `queue_positions` ({account:
+    position}) a Queue column showing where each account waits in the
+    client-side launch queue)."""
+    import pandas as pd
+    status = frame["status"]
+    ran = frame["ran"]
+    in_progress = status.eq("in_progress")
+    last_run = frame["started_at"].where(in_progress, frame["finished_at"]).fillna("")
+    done = pd.to_numeric(frame["scripts_succeeded"], errors="coerce").fillna(0).astype(int).astype(str)
+    total = pd.to_numeric(frame["scripts_total"], errors="coerce").fillna(0).astype(int)
+    df = pd.DataFrame({
+        "Account": frame.index,
+        "Last Run": last_run.where(last_run.ne(""), "—").to_numpy(),
+        "Status": status.map(_BATCH_HISTORY_LABELS).fillna(status).fillna("")
+        .where(ran, "Never run").to_numpy(),
+        "Progress": (done + "/" + total.astype(str)).where(total.ne(0), "").to_numpy(),
+    })
+    if mode_labels:
+        mode = frame["mode"]
+        df["Mode"] = mode.map(mode_labels).fillna(mode).fillna("").where(ran, "").to_numpy()
+    if queue_positions:
+        positions = frame.index.to_series().map(queue_positions)
+        df["Queue"] = ("#" + positions.astype("Int64").astype(str)).where(positions.notna(), "").to_numpy()
+    return df
+
+
+class LaunchQueue:
+    """Client-side queue of batch runs waiting for busy accounts to free up.
+
+    One scheduler thread serves every session. For each queued
+    (customer, batch) it polls batch_account_history and, once an account is
+    no longer held by any batch (the server locks accounts across batches),
+    calls start_batch for it -- never running more than the batch's
+    max_workers accounts of this batch at once. Launch outcomes are kept as
+    notices for the session that queued the account; notices left unread for
+    `notice_idle_seconds` are dropped. The scheduler thread talks to the
+    server through the `client` and `bootstrap_cache` it was given.
+    """
 
-        status = rec.get("status")
-        scripts_done = rec.get("scripts_succeeded")
-        scripts_tot = rec.get("scripts_total")
-        row = {
-            "Account": name,
-            "Last Run": (rec.get("started_at") if status == "in_progress" else rec.get("finished_at")) or "—",
-            "Status": _BATCH_HISTORY_LABELS.get(status, status or ""),
-            "Progress": f"{scripts_done}/{scripts_tot}" if scripts_tot else "",
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, poll_seconds, client, bootstrap_cache, notice_idle_seconds):
+        self.poll_seconds = poll_seconds
+        self.notice_idle_seconds = notice_idle_seconds
+        self._client = client
+        self._bootstrap_cache = bootstrap_cache
+        self._queues = {}       # (customer_id, batch_type) -> [entry, ...] in FIFO order
+        self._max_workers = {}  # (customer_id, batch_type) -> int
+        self._notices = {}      # session_id -> [(batch_type, message, monotonic time), ...]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def enqueue(self, session_id, customer_id, batch_type, accounts, mode, max_workers):
+        key = (customer_id, batch_type)
+        with self._lock:
+            queue = self._queues.setdefault(key, [])
+            queued = {e["account"] for e in queue}
+            queue.extend(
+                {"account": a, "mode": mode, "session_id": session_id, "attempts": 0}
+                for a in accounts if a not in queued
+            )
+            self._max_workers[key] = max_workers
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="batch-launch-queue", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def positions(self, customer_id, batch_type):
+        with self._lock:
+            queue = self._queues.get((customer_id, batch_type), [])
+            return {e["account"]: i for i, e in enumerate(queue, start=1)}
+
+    def queued_by(self, session_id, customer_id, batch_type):
+        with self._lock:
+            queue = self._queues.get((customer_id, batch_type), [])
+            return [e["account"] for e in queue if e["session_id"] == session_id]
+
+    def cancel(self, session_id, customer_id, batch_type):
+        with self._lock:
+            queue = self._queues.get((customer_id, batch_type), [])
+            queue[:] = [e for e in queue if e["session_id"] != session_id]
+
+    def pop_notices(self, session_id, batch_type):
+        self.sweep()
+        with self._lock:
+            notices = self._notices.get(session_id, [])
+            mine = [msg for bt, msg, _ in notices if bt == batch_type]
+            notices[:] = [n for n in notices if n[0] != batch_type]
+            return mine
+
+    def _notify(self, session_id, batch_type, message):
+        with self._lock:
+            self._notices.setdefault(session_id, []).append((batch_type, message, time.monotonic()))
+
+    def sweep(self):
+        """Drop notices left unread for longer than `notice_idle_seconds`."""
+        cutoff = time.monotonic() - self.notice_idle_seconds
+        with self._lock:
+            for sid in list(self._notices):
+                kept = [n for n in self._notices[sid] if n[2] >= cutoff]
+                if kept:
+                    self._notices[sid] = kept
+                else:
+                    del self._notices[sid]
+
+    def _run(self):
+        while True:
+            self.sweep()
+            with self._lock:
+                keys = [k for k, q in self._queues.items() if q]
+                if not keys:
+                    self._thread = None
+                    return
+            for customer_id, batch_type in keys:
+                try:
+                    self._dispatch(customer_id, batch_type)
+                except Exception:
+                    logger.exception(f"Launch queue failed for {customer_id}/{batch_type}")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _dispatch(self, customer_id, batch_type):
+        key = (customer_id, batch_type)
+        resp, _ = call_api(
+            "get", "batch_account_history", client=self._client,
+            params={"customer_id": customer_id, "batch_type": batch_type},
+        )
+        if resp is None:
+            return
+        busy = resp.get("busy") or {}
+        running = sum(1 for bt in busy.values() if bt == batch_type)
+        with self._lock:
+            slots = self._max_workers.get(key, 4) - running
+            ready = [e for e in self._queues.get(key, []) if e["account"] not in busy][:max(slots, 0)]
+        if not ready:
+            return
+
+        by_mode = {}
+        for e in ready:
+            by_mode.setdefault(e["mode"], []).append(e)
+        for mode, entries in by_mode.items():
+            payload = {
+                "customer_id": customer_id,
+                "batch_type": batch_type,
+                "accounts": json.dumps([e["account"] for e in entries]),
+            }
+            if mode:
+                payload["mode"] = mode
+            started, error = call_api("post", "start_batch", client=self._client, data=payload)
+            ok = bool(started and started.get("success"))
+            with self._lock:
+                queue = self._queues.get(key, [])
+                for e in entries:
+                    e["attempts"] += 1
+                done = [e for e in entries if ok or e["attempts"] >= self.MAX_ATTEMPTS]
+                queue[:] = [e for e in queue if not any(e is d for d in done)]
+            names = ", ".join(e["account"] for e in entries)
+            if ok:
+                note = f"Queued run launched as batch {started['batch_id']} for {names}."
+                unres = started.get("accounts_unresolved") or []
+                if unres:
+                    note += f" Skipped (not in d_input_account): {', '.join(unres)}"
+                    self._bootstrap_cache.invalidate(customer_id)
+                logger.info(f"Launch queue started {batch_type} for {customer_id}: {names}")
+            else:
+                logger.error(f"Launch queue could not start {batch_type} for {customer_id}: {error}")
+                note = None
+                if any(e["attempts"] >= self.MAX_ATTEMPTS for e in entries):
+                    note = f"Gave up launching queued run for {names} after {self.MAX_ATTEMPTS} attempts."
+            if note:
+                for session_id in {e["session_id"] for e in entries}:
+                    self._notify(session_id, batch_type, note)
+
+
+@st.cache_resource
+def get_launch_queue():
+    return LaunchQueue(
+        LAUNCH_QUEUE_POLL, get_api_client(), get_bootstrap_cache(), LAUNCH_NOTICE_IDLE_SECONDS,
+    )
+
+
+# Live mode polls the history this often while any account is in progress.
+BATCH_LIVE_INTERVAL = 5
+
+
+def _has_in_progress(entry, key):
+    """Whether any account is running this batch. A paged history only holds
+    one page, so the server-wide busy map is checked as well."""
+    return key in entry["busy"].values() or any(
+        (rec or {}).get("status") == "in_progress" for rec in entry["history"].values()
+    )
+
+
+def _cached_batch_history(customer_id, key, prefix="batch_history_"):
+    entry = st.session_state.get(f"{prefix}{key}")
+    return entry if entry and entry["customer_id"] == customer_id else None
+
+
+def _batch_history_view_params(view):
+    params = {"offset": (view["page"] - 1) * BATCH_HISTORY_PAGE_SIZE, "limit": BATCH_HISTORY_PAGE_SIZE}
+    if view["statuses"]:
+        params["status"] = ",".join(view["statuses"])
+    if view["prefix"]:
+        params["prefix"] = view["prefix"]
+    if view["days"]:
+        params["last_run_days"] = view["days"]
+    return params
+
+
+def _batch_history_request(customer_id, key, entry, view=None):
+    """``(params, etag)`` of a conditional batch_account_history fetch.
+
+    With a `view` (filters and page) the server is asked for just that page,
+    unless it already answered with the whole history, which is then
+    filtered here. The cached copy's validators are only sent for the same
+    query.
+    """
+    params = {"customer_id": customer_id, "batch_type": key}
+    if view is not None and not (entry and entry["paged"] is False):
+        params.update(_batch_history_view_params(view))
+    reuse = entry is not None and entry["params"] == params
+    if reuse and entry.get("version") is not None:
+        params = {**params, "since_version": entry["version"]}
+    return params, entry["etag"] if reuse else None
+
+
+def _batch_history_entry(customer_id, entry, result, params):
+    """The cached history after a conditional fetch with `params` returned `result`."""
+    changed, resp, etag = result
+    if changed or entry is None:
+        resp = resp or {}
+        # A paged answer carries the number of accounts matching the filters
+        # and lists the page's accounts in order.
+        paged = "total" in resp
+        entry = {
+            "customer_id": customer_id,
+            "params": (
+                {k: v for k, v in params.items() if k != "since_version"} if paged
+                else {"customer_id": customer_id, "batch_type": params["batch_type"]}
+            ),
+            "paged": paged,
+            "etag": etag,
+            "version": resp.get("version"),
+            "history": resp.get("history") or {},
+            # {accountname: batch_type} — an account held by ANY batch, since
+            # the server locks accounts across batches.
+            "busy": resp.get("busy") or {},
+            "accounts": resp.get("accounts") or [] if paged else None,
+            "total": resp.get("total") if paged else None,
+            "frame": None,
+            "frame_sig": None,
+            "df": None,
+            "df_sig": None,
         }
+    entry["checked_at"] = time.time()
+    return entry
+
+
+def _load_batch_history(customer_id, key, accounts_sorted, mode_labels, view):
+    """Fetch one page of this batch's history, reusing the last copy when it
+    is unchanged.
+
+    The filters and page in `view` go to the server; a server that answers
+    with the whole history instead has it filtered and paged here, from a
+    frame built once per history. The response and the page's table are kept
+    per batch in session state; the server's ETag (or ``version`` cursor)
+    lets an unchanged history skip the JSON decode and every rebuild.
+    """
+    cache_key = f"batch_history_{key}"
+    entry = _cached_batch_history(customer_id, key)
+    params, etag = _batch_history_request(customer_id, key, entry, view)
+    result = make_conditional_request("batch_account_history", params=params, etag=etag)
+    if result is None:
+        return None
+    entry = _batch_history_entry(customer_id, entry, result, params)
+
+    queue_positions = get_launch_queue().positions(customer_id, key)
+    sig = (
+        tuple(accounts_sorted),
+        tuple(sorted(view.items())),
+        tuple(mode_labels.items()) if mode_labels else None,
+        tuple(sorted(queue_positions.items())),
+    )
+    if entry["df"] is None or entry["df_sig"] != sig:
+        if entry["paged"]:
+            page = _batch_history_frame(entry["accounts"], entry["history"])
+        else:
+            if entry["frame"] is None or entry["frame_sig"] != sig[0]:
+                entry["frame"] = _batch_history_frame(accounts_sorted, entry["history"])
+                entry["frame_sig"] = sig[0]
+            matching = _filter_batch_history(entry["frame"], view)
+            entry["total"] = len(matching)
+            offset = (view["page"] - 1) * BATCH_HISTORY_PAGE_SIZE
+            page = matching.iloc[offset:offset + BATCH_HISTORY_PAGE_SIZE]
+        entry["df"] = _format_batch_history(page, mode_labels, queue_positions)
+        entry["df_sig"] = sig
+
+    st.session_state[cache_key] = entry
+    return entry
+
+
+def fetch_batch_histories(requests_by_key):
+    """Run several conditional batch_account_history fetches at once.
+
+    `requests_by_key` maps a batch key to its ``(params, etag)``. The calls
+    share the I/O pool, so the wall time is close to the slowest call rather
+    than the sum. Returns ``{key: (result, error message, seconds)}`` and
+    makes no Streamlit calls.
+    """
+    def fetch(params, etag):
+        started = time.perf_counter()
+        result, error = conditional_call("batch_account_history", params=params, etag=etag)
+        return result, error, time.perf_counter() - started
+
+    pool = get_io_pool()
+    jobs = {key: pool.submit(fetch, *request) for key, request in requests_by_key.items()}
+    return {key: job.result() for key, job in jobs.items()}
+
+
+def _build_batch_overview_df(accounts_sorted, batches, histories):
+    """Accounts × batch types; each cell sums up the account's latest run.
+
+    `histories` maps a batch key to its history, or to None when it could
+    not be fetched.
+    """
+    import pandas as pd
+    columns = {}
+    for batch in batches:
+        key = batch.get("key")
+        label = batch.get("label") or key
+        history = histories.get(key)
+        if history is None:
+            columns[label] = "Unavailable"
+            continue
+        modes = batch.get("modes") or []
+        mode_labels = {m["key"]: m.get("label") or m["key"] for m in modes} if modes else None
+        df = _format_batch_history(_batch_history_frame(accounts_sorted, history), mode_labels)
+        parts = [df["Progress"], df["Last Run"].where(df["Last Run"].ne("—"), "")]
         if mode_labels:
-            row["Mode"] = mode_labels.get(rec.get("mode"), rec.get("mode") or "")
-        rows.append(row)
+            parts.insert(1, df["Mode"])
+        cell = df["Status"]
+        for part in parts:
+            cell = cell + (" · " + part).where(part.ne(""), "")
+        columns[label] = cell.to_numpy()
+    return pd.DataFrame({"Account": accounts_sorted, **columns})
+
+
+def _batch_history_table(customer_id, key, accounts_sorted, mode_labels, view, interval):
+    """History page; with `interval` set it reruns on its own to poll."""
+    entry = st.session_state.get(f"batch_history_{key}")
+    # The full-app run that registered the fragment has just fetched.
+    if interval and entry and time.time() - entry["checked_at"] >= interval - 0.5:
+        busy_before = entry["busy"]
+        entry = _load_batch_history(customer_id, key, accounts_sorted, mode_labels, view)
+        if entry is None:
+            return
+        # A finished account changes the selectable list outside this
+        # fragment, and with nothing in progress polling should stop.
+        if entry["busy"] != busy_before or not _has_in_progress(entry, key):
+            st.rerun()
+
+    st.dataframe(entry["df"], width="stretch", hide_index=True)
 
-    cols = ["Account", "Last Run", "Status", "Progress"] + (["Mode"] if mode_labels else [])
-    return pd.DataFrame(rows, columns=cols)
+
+class BatchTypesCache:
+    """Batch definitions per customer, shared by every session of the process.
+
+    An entry is replaced as a whole and never mutated, so a reader always sees
+    one consistent version of the YAML configs. Once an entry is older than
+    `revalidate_after` seconds it is still served, but the read starts a
+    background request that asks the server whether it changed (If-None-Match
+    with its ETag, or the ``version`` cursor). Only a changed answer swaps in
+    a new entry. There is at most one request per customer in flight;
+    everyone who needs an answer waits on that one. Requests go through the
+    `client` the cache was built with, since they run on its own threads.
+    """
+
+    def __init__(self, revalidate_after, client, max_workers=4):
+        self.revalidate_after = revalidate_after
+        self._client = client
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-types")
+        self._entries = {}   # customer_id -> entry
+        self._inflight = {}  # customer_id -> Future of (types, error message)
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.not_modified = 0
+        self.swaps = 0
+        self.errors = 0
+
+    def get(self, customer_id, timings=None):
+        """``(types, error message)``; waits only when nothing is cached yet.
+
+        Makes no Streamlit calls. The wait, or a zero for a cached answer, is
+        written into `timings` like load_customer_bootstrap does.
+        """
+        timings = {} if timings is None else timings
+        with self._lock:
+            entry = self._entries.get(customer_id)
+        if entry is None:
+            started = time.perf_counter()
+            result = self._request(customer_id).result()
+            timings["batch_types"] = time.perf_counter() - started
+            return result
+        if time.monotonic() - entry["checked_at"] >= self.revalidate_after:
+            self._request(customer_id)
+        timings["batch_types (cached)"] = 0.0
+        return entry["types"], None
+
+    def revalidate(self, customer_id):
+        """Ask the server now and wait for the answer: ``(types, error message)``."""
+        return self._request(customer_id).result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "customers": len(self._entries),
+                "in_flight": len(self._inflight),
+                "revalidate_after": self.revalidate_after,
+                "fetches": self.fetches,
+                "not_modified": self.not_modified,
+                "swaps": self.swaps,
+                "errors": self.errors,
+            }
+
+    def _request(self, customer_id):
+        with self._lock:
+            future = self._inflight.get(customer_id)
+            if future is None:
+                future = self._pool.submit(self._fetch, customer_id)
+                self._inflight[customer_id] = future
+            return future
+
+    def _fetch(self, customer_id):
+        try:
+            return self._revalidate(customer_id)
+        finally:
+            with self._lock:
+                self._inflight.pop(customer_id, None)
+
+    def _revalidate(self, customer_id):
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            self.fetches += 1
+        params = {"customer_id": customer_id}
+        if entry and entry["version"] is not None:
+            params["since_version"] = entry["version"]
+        result, error = conditional_call(
+            "batch_types", params=params, etag=entry["etag"] if entry else None, client=self._client,
+        )
+        types = None
+        if result is not None:
+            changed, data, etag = result
+            types = (data or {}).get("batch_types") if changed else None
+            if types is None and changed:
+                error = "The server's answer has no batch definitions."
+
+        now = time.monotonic()
+        with self._lock:
+            current = self._entries.get(customer_id)
+            if types is None:
+                if error:
+                    self.errors += 1
+                elif current is not None:
+                    self.not_modified += 1
+                if current is not None:
+                    # Unchanged, or the server is failing: keep serving what we
+                    # have and ask again after another revalidate_after.
+                    self._entries[customer_id] = {**current, "checked_at": now}
+                    return current["types"], None
+                return None, error or "The server did not send any batch definitions."
+
+            digest = hashlib.sha256(dumps_json(types)).hexdigest()
+            if current is not None and current["digest"] == digest:
+                # Same definitions under a new validator: keep the old object.
+                self.not_modified += 1
+                types = current["types"]
+            elif current is not None:
+                self.swaps += 1
+                logger.info(f"Batch definitions changed for customer_id={customer_id}")
+            self._entries[customer_id] = {
+                "types": types,
+                "etag": etag,
+                "version": data.get("version"),
+                "digest": digest,
+                "checked_at": now,
+            }
+            return types, None
+
+
+@st.cache_resource
+def get_batch_types_cache():
+    return BatchTypesCache(BATCH_TYPES_REVALIDATE, get_api_client())
 
 
 def get_batch_types():
     """Batch tabs are driven by the server's YAML configs, so nothing about the
-    batches (labels, modes, script lists) is duplicated in the frontend."""
-    customer_id = st.session_state.get("customer_id") or ""
-    if (
-        st.session_state.get("batch_types") is not None
-        and st.session_state.get("batch_types_customer") == customer_id
-    ):
-        return st.session_state["batch_types"]
+    batches (labels, modes, script lists) is duplicated in the frontend.
 
-    resp = make_api_request("get", "batch_types", params={"customer_id": customer_id})
-    types = (resp or {}).get("batch_types")
-    if types is None:
-        return None  # backend unreachable — caller reports it
-    st.session_state["batch_types"] = types
-    st.session_state["batch_types_customer"] = customer_id
-    return types
+    Returns ``(types, error message)``; types is None when the backend could
+    not be reached, and the caller shows the error on the Batches page.
+    """
+    customer_id = st.session_state.get("customer_id") or ""
+    return get_batch_types_cache().get(customer_id)
 
 
+@timed_render(label=lambda batch: f"batch_tab:{batch.get('key')}")
 def batch_tab(batch: dict):
     """Multi-select accounts and run one YAML-defined batch across them.
 
@@ -842,24 +3053,16 @@ def batch_tab(batch: dict):
     if st.session_state.get(notice_key):
         st.success(st.session_state[notice_key])
         st.session_state[notice_key] = None
+    launch_queue = get_launch_queue()
+    for note in launch_queue.pop_notices(_session_id(), key):
+        st.success(note)
 
     customer_id = st.session_state["customer_id"]
     accounts_sorted = sorted(st.session_state.get("account_names", []) or [])
     modes = batch.get("modes") or []
     mode_labels = {m["key"]: m.get("label") or m["key"] for m in modes}
 
-    resp = make_api_request(
-        "get", "batch_account_history",
-        params={"customer_id": customer_id, "batch_type": key},
-    )
-    if resp is None:
-        return
-    history = resp.get("history") or {}
-    # {accountname: batch_type} — an account held by ANY batch, since the server
-    # locks accounts across batches.
-    busy = resp.get("busy") or {}
-
-    all_types = st.session_state.get("batch_types") or []
+    all_types = get_batch_types_cache().get(customer_id)[0] or []
     type_labels = {b.get("key"): (b.get("label") or b.get("key")) for b in all_types}
     type_labels.setdefault("update_new_ui_data", "Update New UI Data (retired)")
 
@@ -867,32 +3070,73 @@ def batch_tab(batch: dict):
     st.caption(
         "Most recent run of this batch per account for this customer. "
         "\"Never run\" means this batch has not been run for that account. "
-        "Click Refresh to fetch the latest progress."
+        "Click Refresh to fetch the latest progress, or turn on Live updates."
     )
 
-    if st.button("Refresh", key=f"batch_refresh_{key}"):
-        # Also drop the cached batch definitions, so a YAML edit on the server
-        # (a changed label or mode) shows up without restarting the app.
-        st.session_state["batch_types"] = None
+    c1, c2 = st.columns([1, 4])
+    if c1.button("Refresh", key=f"batch_refresh_{key}"):
+        # Also revalidate the shared batch definitions, so a YAML edit on the
+        # server (a changed label or mode) shows up without restarting the app.
+        get_batch_types_cache().revalidate(customer_id)
         st.rerun()
+    live = c2.toggle(
+        "Live updates",
+        key=f"batch_live_{key}",
+        help=f"Poll every {BATCH_LIVE_INTERVAL}s while any account is in progress.",
+    )
 
-    st.dataframe(
-        _build_batch_history_df(accounts_sorted, history, mode_labels if modes else None),
-        width="stretch",
-        hide_index=True,
+    f1, f2, f3, f4 = st.columns([3, 2, 2, 1])
+    statuses = f1.multiselect(
+        "Status",
+        [_NEVER_RUN, *_BATCH_HISTORY_LABELS],
+        key=f"batch_filter_status_{key}",
+        format_func=lambda s: "Never run" if s == _NEVER_RUN else _BATCH_HISTORY_LABELS[s],
     )
+    prefix = f2.text_input("Account name starts with", key=f"batch_filter_prefix_{key}")
+    window = f3.selectbox("Last run", list(_BATCH_HISTORY_WINDOWS), key=f"batch_filter_window_{key}")
+    # Changing a filter goes back to the first page; the page input has not
+    # been created yet in this run, so its key can still be written.
+    filters = (tuple(statuses), prefix.strip(), _BATCH_HISTORY_WINDOWS[window])
+    page_key = f"batch_filter_page_{key}"
+    if st.session_state.get(f"batch_filter_sig_{key}") != filters:
+        st.session_state[f"batch_filter_sig_{key}"] = filters
+        st.session_state[page_key] = 1
+    page = f4.number_input("Page", min_value=1, step=1, key=page_key)
+    view = {"statuses": filters[0], "prefix": filters[1], "days": filters[2], "page": int(page)}
+
+    entry = _load_batch_history(customer_id, key, accounts_sorted, mode_labels if modes else None, view)
+    if entry is None:
+        return
+    busy = entry["busy"]
+
+    interval = BATCH_LIVE_INTERVAL if live and _has_in_progress(entry, key) else None
+    st.fragment(_batch_history_table, run_every=interval)(
+        customer_id, key, accounts_sorted, mode_labels if modes else None, view, interval,
+    )
+    pages = max(1, -(-(entry["total"] or 0) // BATCH_HISTORY_PAGE_SIZE))
+    st.caption(f"Page {view['page']} of {pages} · {entry['total']} matching account(s).")
+    if live and interval is None:
+        st.caption("Live updates are paused: no account is in progress.")
 
     st.subheader("Select accounts to run")
     if busy:
         st.info(
-            "Currently running and excluded from selection: "
+            "Currently running; selecting them queues a run that starts once they free up: "
             + ", ".join(
                 f"{name} (in {type_labels.get(bt, bt)})"
                 for name, bt in sorted(busy.items())
             )
         )
+    my_queued = launch_queue.queued_by(_session_id(), customer_id, key)
+    if my_queued:
+        q1, q2 = st.columns([4, 1])
+        q1.caption(f"You have {len(my_queued)} queued run(s): {', '.join(my_queued)}.")
+        if q2.button("Cancel queued", key=f"batch_queue_cancel_{key}"):
+            launch_queue.cancel(_session_id(), customer_id, key)
+            st.rerun()
 
-    selectable_accounts = [a for a in accounts_sorted if a not in busy]
+    queued = launch_queue.positions(customer_id, key)
+    selectable = set(accounts_sorted).difference(queued)
     sel_key = f"batch_selected_{key}"
     # A launch asks for the selection to be cleared on the NEXT run: this key
     # belongs to the multiselect, and Streamlit forbids writing a widget's key
@@ -903,17 +3147,41 @@ def batch_tab(batch: dict):
     # the widget is created, so the stored value always matches the options.
     if sel_key in st.session_state:
         st.session_state[sel_key] = [
-            a for a in st.session_state[sel_key] if a in selectable_accounts
+            a for a in st.session_state[sel_key] if a in selectable
         ]
+    selected_now = st.session_state.get(sel_key, [])
+
+    # Only the accounts being looked for are sent to the browser: the
+    # search's first matches (or, without a search, the history page above)
+    # plus whatever is already selected.
+    s1, s2 = st.columns([4, 1], vertical_alignment="bottom")
+    search = s1.text_input(
+        "Find accounts", key=f"batch_search_{key}", placeholder="Part of an account name",
+    ).strip().lower()
+    if search:
+        matches = [a for a in accounts_sorted if a in selectable and search in a.lower()]
+        offered = matches[:BATCH_ACCOUNT_MATCHES]
+    else:
+        matches = offered = [a for a in entry["df"]["Account"] if a in selectable]
+    if search and matches and s2.button(f"Select all {len(matches)}", key=f"batch_select_all_{key}"):
+        selected_now = list(dict.fromkeys([*selected_now, *matches]))
+        st.session_state[sel_key] = selected_now
     selected = st.multiselect(
         "Accounts",
-        options=selectable_accounts,
+        options=sorted(set(selected_now).union(offered)),
         key=sel_key,
+        format_func=lambda a: f"{a} (busy, will queue)" if a in busy else a,
         help=(
             "Pick one or more accounts; each runs in its own thread "
-            f"(max {batch.get('max_workers', 4)} in parallel)."
+            f"(max {batch.get('max_workers', 4)} in parallel). Busy accounts "
+            "are queued and launched automatically when they free up."
         ),
     )
+    if len(matches) > len(offered):
+        st.caption(
+            f"Showing {BATCH_ACCOUNT_MATCHES} of {len(matches)} matching accounts; "
+            "type more of the name to narrow them down."
+        )
 
     chosen_mode = None
     if modes:
@@ -929,18 +3197,24 @@ def batch_tab(batch: dict):
         chosen_mode = next(m["key"] for m in modes if mode_labels[m["key"]] == chosen_label)
 
     if st.button("Run batch", disabled=not selected, type="primary", key=f"batch_run_{key}"):
-        payload = {
-            "customer_id": customer_id,
-            "batch_type": key,
-            "accounts": json.dumps(selected),
-        }
-        if chosen_mode:
-            payload["mode"] = chosen_mode
-
-        with st.spinner("Launching batch..."):
-            resp = make_api_request("post", "start_batch", data=payload)
-
-        if resp and resp.get("success"):
+        to_queue = [a for a in selected if a in busy]
+        to_start = [a for a in selected if a not in busy]
+        notes = []
+        if to_start:
+            payload = {
+                "customer_id": customer_id,
+                "batch_type": key,
+                "accounts": json.dumps(to_start),
+            }
+            if chosen_mode:
+                payload["mode"] = chosen_mode
+
+            with st.spinner("Launching batch..."):
+                resp = make_api_request("post", "start_batch", data=payload)
+
+            if not (resp and resp.get("success")):
+                st.error("Failed to launch batch. Check server logs.")
+                return
             note = f"Batch {resp['batch_id']} launched for {resp['accounts_resolved']} account(s)"
             if resp.get("mode"):
                 note += f" in {mode_labels.get(resp['mode'], resp['mode'])} mode"
@@ -948,29 +3222,369 @@ def batch_tab(batch: dict):
             unres = resp.get("accounts_unresolved") or []
             if unres:
                 note += f" Skipped (not in d_input_account): {', '.join(unres)}"
-            st.session_state[notice_key] = note
-            st.session_state[f"batch_clear_{key}"] = True
-            st.rerun()
-        else:
-            st.error("Failed to launch batch. Check server logs.")
+                # The server's account list no longer matches what was cached
+                # for this customer; the next connect refetches it.
+                get_bootstrap_cache().invalidate(customer_id)
+            notes.append(note)
+        if to_queue:
+            launch_queue.enqueue(
+                _session_id(), customer_id, key, to_queue, chosen_mode, batch.get("max_workers", 4),
+            )
+            notes.append(f"Queued {len(to_queue)} busy account(s): {', '.join(to_queue)}.")
+        st.session_state[notice_key] = " ".join(notes)
+        st.session_state[f"batch_clear_{key}"] = True
+        st.rerun()
+
+
+@timed_render()
+def batch_overview_tab():
+    """Every batch's latest run per account in one grid."""
+    st.header("Batch Overview")
+    if not st.session_state.setup_complete:
+        st.info("Complete Initial Setup to enable this section.")
+        return
+
+    customer_id = st.session_state["customer_id"]
+    accounts_sorted = sorted(st.session_state.get("account_names", []) or [])
+    batches = [
+        b for b in get_batch_types_cache().get(customer_id)[0] or []
+        if b.get("key") and not b.get("error")
+    ]
+    if not batches:
+        st.info("No batches are configured for this customer.")
+        return
+
+    c1, c2 = st.columns([1, 4])
+    if c1.button("Refresh", key="batch_overview_refresh"):
+        st.rerun()
+
+    # The overview asks for whole histories and keeps them under its own
+    # keys: a batch tab's entry holds one filtered page, and storing a whole
+    # history there would switch the tab off server paging. Only a tab that
+    # already works on the whole history (its server does not page) shares
+    # the overview's copy, ETag included.
+    entries = {}
+    for b in batches:
+        tab_entry = _cached_batch_history(customer_id, b["key"])
+        shared = tab_entry is not None and tab_entry["paged"] is False
+        entries[b["key"]] = (
+            tab_entry if shared else _cached_batch_history(customer_id, b["key"], "batch_overview_")
+        )
+    fetches = {key: _batch_history_request(customer_id, key, entry) for key, entry in entries.items()}
+    started = time.perf_counter()
+    results = fetch_batch_histories(fetches)
+    wall = time.perf_counter() - started
+
+    histories = {}
+    failed = []
+    for batch in batches:
+        key = batch["key"]
+        result, error, _ = results[key]
+        if result is None:
+            failed.append(f"{batch.get('label') or key}: {error}")
+            histories[key] = None
+            continue
+        entry = _batch_history_entry(customer_id, entries[key], result, fetches[key][0])
+        st.session_state[f"batch_overview_{key}"] = entry
+        tab_entry = _cached_batch_history(customer_id, key)
+        if tab_entry is not None and tab_entry["params"] == entry["params"]:
+            st.session_state[f"batch_history_{key}"] = entry
+        histories[key] = entry["history"]
+
+    for message in failed:
+        st.error(message)
+    st.dataframe(
+        _build_batch_overview_df(accounts_sorted, batches, histories),
+        width="stretch", hide_index=True,
+    )
+    slowest = max(secs for _, _, secs in results.values())
+    c2.caption(
+        f"{len(batches)} batch histories fetched together in {wall * 1000:.0f} ms "
+        f"(slowest call {slowest * 1000:.0f} ms)."
+    )
+
+
+# --- Workspace ---
+# Session keys that belong to the active customer. Switching customers saves
+# them into the workspace and restores the other customer's copies, so each
+# customer keeps its accounts and tab state.
+_CUSTOMER_STATE_KEYS = (
+    "ds_root", "customer_name", "account_names", "connect_timings",
+    "contact_account", "ranks_account", "rec_account", "_prev_ranks_account",
+    "ranks_page", "ranks_changes", "ranks_editor_version", "ranks_patch_rows",
+    "confirm_ranks_pending",
+)
+_CUSTOMER_STATE_PREFIXES = (
+    "batch_selected_", "batch_live_", "batch_history_", "batch_notice_", "batch_filter_",
+    "batch_search_", "batch_overview_", "ranks_full_replace_",
+)
+
+
+def _customer_state_keys():
+    return [
+        k for k in st.session_state
+        if k in _CUSTOMER_STATE_KEYS or k.startswith(_CUSTOMER_STATE_PREFIXES)
+    ]
+
+
+def new_workspace_entry(ds_root, customer_name, account_names, timings=None):
+    state = {
+        "ds_root": ds_root,
+        "customer_name": customer_name,
+        "account_names": account_names,
+        "connect_timings": timings,
+    }
+    for k in ("contact_account", "ranks_account", "rec_account"):
+        state[k] = account_names[0] if account_names else None
+    return {"customer_name": customer_name, "state": state}
+
+
+def activate_customer(customer_id):
+    """Make a workspace customer the active one, keeping the current one's state."""
+    workspace = st.session_state["workspace"]
+    current = st.session_state.get("customer_id")
+    if current in workspace and st.session_state.get("setup_complete"):
+        workspace[current]["state"] = {k: st.session_state[k] for k in _customer_state_keys()}
+
+    for k in _customer_state_keys():
+        del st.session_state[k]
+    initialize_session_state()
+    st.session_state.update(workspace[customer_id]["state"])
+    st.session_state["customer_id"] = customer_id
+    st.session_state["setup_complete"] = True
+
+
+def close_customer(customer_id):
+    workspace = st.session_state["workspace"]
+    workspace.pop(customer_id, None)
+    if st.session_state.get("customer_id") != customer_id:
+        return
+    if workspace:
+        # The closed customer's state is dropped, not saved.
+        st.session_state["setup_complete"] = False
+        activate_customer(next(iter(workspace)))
+    else:
+        for k in _customer_state_keys():
+            del st.session_state[k]
+        st.session_state["customer_id"] = ""
+        st.session_state["setup_complete"] = False
+        initialize_session_state()
+
+
+def _on_workspace_select(widget_key):
+    activate_customer(st.session_state[widget_key])
+
+
+def _on_workspace_add():
+    customer_id = (st.session_state.get("workspace_add_id") or "").strip()
+    st.session_state["workspace_add_id"] = ""
+    if not customer_id or customer_id in st.session_state["workspace_pending"]:
+        return
+    st.session_state["workspace_errors"].pop(customer_id, None)
+    pool = get_workspace_pool()
+    # Connects run on their own pool (their calls go to the I/O pool); the
+    # sidebar picks up the results.
+    st.session_state["workspace_pending"][customer_id] = (
+        pool.submit(
+            load_customer_bootstrap, customer_id,
+            client=get_api_client(), cache=get_bootstrap_cache(), pool=get_io_pool(),
+        ),
+        pool.submit(get_batch_types_cache().get, customer_id),
+    )
+
+
+def _workspace_pending():
+    """Collect finished background connects; reruns on its own while any run."""
+    pending = st.session_state["workspace_pending"]
+    finished = [cid for cid, jobs in pending.items() if all(j.done() for j in jobs)]
+    for customer_id in finished:
+        bootstrap_job, _ = pending.pop(customer_id)
+        bootstrap, error = bootstrap_job.result()
+        if not bootstrap:
+            st.session_state["workspace_errors"][customer_id] = error or "Could not connect."
+            continue
+        st.session_state["workspace"][customer_id] = new_workspace_entry(
+            bootstrap["ds_root"], bootstrap["customer_name"], list(bootstrap["accounts"]),
+        )
+    if finished:
+        st.rerun()
+    for customer_id in pending:
+        st.caption(f"⏳ Connecting {customer_id}...")
+
+
+def workspace_sidebar():
+    """Switch between connected customers, or connect more in the background."""
+    workspace = st.session_state["workspace"]
+    st.markdown("### Workspace")
+    if workspace:
+        ids = list(workspace)
+        current = st.session_state.get("customer_id")
+        # Keyed by the active customer, so the widget is recreated (and shows
+        # the right selection) whenever the active customer changes.
+        widget_key = f"workspace_select_{current}"
+        st.selectbox(
+            "Active customer",
+            ids,
+            index=ids.index(current) if current in ids else 0,
+            format_func=lambda cid: f"{workspace[cid]['customer_name'] or cid} ({cid})",
+            key=widget_key,
+            on_change=_on_workspace_select,
+            args=(widget_key,),
+        )
+        if current in workspace:
+            st.button("Close this customer", on_click=close_customer, args=(current,))
+
+    st.text_input("Add customer (ID)", key="workspace_add_id", on_change=_on_workspace_add)
+    for customer_id, error in list(st.session_state["workspace_errors"].items()):
+        st.error(f"{customer_id}: {error}")
+    if st.session_state["workspace_pending"]:
+        st.fragment(_workspace_pending, run_every=1)()
 
 
 # --- Main ---
+# Widgets whose value must outlive a section switch. Streamlit drops a widget's
+# state on any run where the widget isn't drawn, which under lazy navigation is
+# every run spent on another section.
+_STICKY_WIDGET_KEYS = ("contact_account", "ranks_account", "rec_account")
+_STICKY_WIDGET_PREFIXES = ("batch_selected_", "batch_live_", "batch_filter_", "batch_search_")
+
+
+def _keep_widget_state():
+    for k in list(st.session_state.keys()):
+        if k in _STICKY_WIDGET_KEYS or k.startswith(_STICKY_WIDGET_PREFIXES):
+            st.session_state[k] = st.session_state[k]
+
+
+def batch_types_error(error=None):
+    st.error(
+        "Could not load the batch definitions from the server. "
+        "Check that the backend is reachable and that the batch YAML files exist."
+    )
+    if error:
+        st.caption(error)
+
+
+def rerun_profiles_panel():
+    """Summary of the kept rerun profiles, each downloadable as a .prof dump."""
+    import pandas as pd
+    profiler = get_rerun_profiler()
+    rows, profiles = profiler.summary()
+    if not rows:
+        st.caption("No rerun profiled yet.")
+        return
+    st.dataframe(pd.DataFrame(rows), width="stretch", hide_index=True)
+    if profiler.skipped:
+        st.caption(f"{profiler.skipped} overlapping rerun(s) were not profiled.")
+    pick = st.selectbox(
+        "Profile",
+        range(len(profiles)),
+        format_func=lambda i: f"{rows[i]['Started']} · {rows[i]['Session']} · {rows[i]['Wall (ms)']} ms",
+        key="rerun_profile_pick",
+    )
+    chosen = profiles[pick]
+    st.download_button(
+        "Download cProfile dump",
+        chosen["dump"],
+        file_name=f"rerun_{time.strftime('%Y%m%d_%H%M%S', time.localtime(chosen['started_at']))}.prof",
+        mime="application/octet-stream",
+        key="rerun_profile_download",
+    )
+    with st.expander("Top functions (cumulative)"):
+        st.code(chosen["top"], language=None)
+
+
+def metrics_admin_view():
+    """Hidden page at ?admin=<PORTAL_ADMIN_TOKEN>: metrics of this process."""
+    import pandas as pd
+    metrics = get_metrics()
+    st.title("Portal metrics")
+    st.caption(
+        f"Since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(metrics.started_at))}. "
+        "Percentiles are bucket upper bounds."
+    )
+    if st.button("Refresh", key="metrics_refresh"):
+        st.rerun()
+    endpoints, renders = metrics.summary()
+    st.subheader("API endpoints")
+    st.dataframe(pd.DataFrame(endpoints), width="stretch", hide_index=True)
+    st.subheader("Tab renders")
+    st.dataframe(pd.DataFrame(renders), width="stretch", hide_index=True)
+    st.subheader("Connection pool and caches")
+    st.json({
+        "http_pool": get_api_client().pool_stats(),
+        "bootstrap_cache": get_bootstrap_cache().stats(),
+        "batch_types_cache": get_batch_types_cache().stats(),
+        "artifact_cache": get_artifact_cache().stats() if get_artifact_cache() else None,
+    })
+    text = metrics.prometheus_text()
+    st.download_button("Download Prometheus metrics", text, file_name="portal_metrics.prom", mime="text/plain")
+    with st.expander("Prometheus text"):
+        st.code(text, language=None)
+    if PROFILE_RERUNS:
+        st.subheader("Rerun profiles")
+        rerun_profiles_panel()
+
+
 def main():
+    if ADMIN_TOKEN and st.query_params.get("admin") == ADMIN_TOKEN:
+        metrics_admin_view()
+        return
+
     st.title("CSM Backend Portal - Next Quarter")
 
+    if st.session_state["workspace"] or st.session_state["workspace_pending"]:
+        with st.sidebar:
+            workspace_sidebar()
+
     if st.session_state.setup_complete:
+        # Any rerun counts as the session still wanting its prefetched exports.
+        get_export_prefetcher().touch(_session_id())
         with st.sidebar:
             st.markdown("### Customer Details")
             st.markdown(f"**Name:** {st.session_state['customer_name']}")
             st.markdown(f"**ID:** {st.session_state['customer_id']}")
             st.markdown(f"**Accounts:** {len(st.session_state.get('account_names', []))}")
+            st.toggle(
+                "Regenerate exports",
+                key="regenerate_exports",
+                help="Ask the server for freshly generated Excel files instead of reusing a recent copy.",
+            )
+            config_monitors()
+
+    if PROFILE_RERUNS:
+        with st.sidebar.expander("Rerun profiles"):
+            rerun_profiles_panel()
 
     base_labels = ["Initial Setup", "Manage Contacts", "Update Ranks", "Update Recommendations"]
     base_tabs = [initial_setup_tab, contacts_tab, ranks_tab, update_recommendation_tab]
 
-    batch_types = get_batch_types()
+    batch_types, batch_types_problem = get_batch_types()
     batches = batch_types or []
+    if batches:
+        base_labels.append("Batch Overview")
+        base_tabs.append(batch_overview_tab)
+
+    if LAZY_NAV:
+        pages = [
+            st.Page(render, title=label, default=(i == 0))
+            for i, (label, render) in enumerate(zip(base_labels, base_tabs))
+        ]
+        for i, batch in enumerate(batches):
+            pages.append(st.Page(
+                functools.partial(batch_tab, batch),
+                title=batch.get("label") or batch.get("key") or "Batch",
+                url_path=f"batch_{batch.get('key') or i}",
+            ))
+        if batch_types is None:
+            pages.append(st.Page(
+                functools.partial(batch_types_error, batch_types_problem),
+                title="Batches", url_path="batches",
+            ))
+
+        _keep_widget_state()
+        st.navigation(pages, position="top").run()
+        return
+
     labels = base_labels + [b.get("label") or b.get("key") for b in batches]
     if batch_types is None:
         labels.append("Batches")
@@ -987,18 +3601,23 @@ def main():
 
     if batch_types is None:
         with tabs[-1]:
-            st.error(
-                "Could not load the batch definitions from the server. "
-                "Check that the backend is reachable and that the batch YAML files exist."
-            )
+            batch_types_error(batch_types_problem)
 
 
 if __name__ == "__main__":
-    if not API_KEY:
-        st.error("API_KEY is not set. Please configure it in your environment variables.")
-        logger.critical("RM_API_KEY environment variable not found.")
-    elif not API_BASE:
-        st.error("API_BASE is not set. Please configure it in your environment variables.")
-        logger.critical("API_BASE environment variable not found.")
-    else:
-        main()
+    # Everything the rerun does runs inside the try, so finish() always
+    # releases the profiler.
+    _rerun_profile = get_rerun_profiler().start() if PROFILE_RERUNS else None
+    try:
+        setup_page()
+        if not API_KEY:
+            st.error("API_KEY is not set. Please configure it in your environment variables.")
+            logger.critical("RM_API_KEY environment variable not found.")
+        elif not API_BASE:
+            st.error("API_BASE is not set. Please configure it in your environment variables.")
+            logger.critical("API_BASE environment variable not found.")
+        else:
+            main()
+    finally:
+        if _rerun_profile is not None:
+            get_rerun_profiler().finish(_rerun_profile)
@@ -0,0 +1,82 @@
+"""Chunked contacts upload against the local stub backend."""
+import io
+import os
+import sys
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from stub_backend import StubBackend  # noqa: E402
+
+CSV = b"".join(b"contact_%06d,someone_%06d@example.com\n" % (i, i) for i in range(60000))
+
+
+@pytest.fixture(scope="module")
+def backend():
+    backend = StubBackend().start()
+    yield backend
+    backend.stop()
+
+
+@pytest.fixture
+def app(backend, monkeypatch):
+    os.environ.setdefault("API_BASE", backend.url)
+    os.environ.setdefault("RM_API_KEY", "test")
+    import csmforchirag as app
+
+    client = app.ApiClient(backend.url, {}, metrics=app.PortalMetrics())
+    monkeypatch.setattr(app, "get_api_client", lambda: client)
+    monkeypatch.setattr(app, "CONTACTS_CHUNK_BYTES", 256 * 1024)
+    monkeypatch.setattr(app, "CONTACTS_RETRY_DELAY", 0)
+    backend.reset_counts()
+    return app
+
+
+def upload(app, state):
+    return app.upload_contacts_chunked(io.BytesIO(CSV), len(CSV), "cust", "acme", state)
+
+
+def test_lost_chunk_answer_resumes_from_server_offset(app, backend):
+    backend.fail("upload_contacts_chunk", process=True)
+    state = {}
+    result = upload(app, state)
+    assert result["bytes"] == len(CSV)
+    assert backend.counts["upload_contacts_status"] == 1
+    assert state == {}
+
+
+def test_failed_upload_resumes_in_a_later_call(app, backend):
+    state = {}
+    backend.fail("upload_contacts_chunk", times=app.CONTACTS_CHUNK_RETRIES + 1)
+    with pytest.raises(requests.exceptions.HTTPError):
+        upload(app, state)
+    assert state["upload_id"]
+
+    result = upload(app, state)
+    assert result["bytes"] == len(CSV)
+    assert backend.counts["upload_contacts_start"] == 1
+
+
+def test_unreachable_status_does_not_skip_retries(app, backend):
+    backend.fail("upload_contacts_chunk", times=2)
+    backend.fail("upload_contacts_status", times=2)
+    result = upload(app, {})
+    assert result["bytes"] == len(CSV)
+
+
+def test_offset_that_never_advances_gives_up(app, backend, monkeypatch):
+    respond = backend.respond
+
+    def stuck(method, endpoint, query, body, headers):
+        if endpoint == "upload_contacts_chunk":
+            return 200, {"offset": 0}, {}
+        return respond(method, endpoint, query, body, headers)
+
+    monkeypatch.setattr(backend, "respond", stuck)
+    with pytest.raises(requests.exceptions.RequestException, match="offset stayed"):
+        upload(app, {})
+    assert backend.counts["upload_contacts_chunk"] == app.CONTACTS_CHUNK_RETRIES + 1